@@ -0,0 +1,164 @@
+"""
+Counts the draw calls made by the elements of the `test.py` layout, and the
+writes to the backend needed to put them on screen, with and without
+coalescing the changed cells into longer runs. Also times each frame at a few
+terminal sizes. Everything is drawn to a `HeadlessBackend`, so no terminal is
+needed.
+"""
+
+import asyncio
+import time
+from typing import List, Tuple
+
+import curses
+
+from tuiform.element import TUIWindow, TUIElement
+from tuiform.backend import HeadlessBackend
+from tuiform.style import color_pair
+from tuiform.clipboard import CopyableObject
+from tuiform.text import DataValue, Text
+from tuiform.button import Button
+from tuiform.stack import Stack
+from tuiform.panel import Panel
+from tuiform.enums import Orientation
+
+
+class CountingBackend(HeadlessBackend):
+    """Counts the calls to `write`"""
+
+    writes: int = 0
+
+    def write(self, x: int, y: int, text: str, style: int = None) -> None:
+        self.writes += 1
+        super().write(x, y, text, style)
+
+
+class CountingWindow(TUIWindow):
+    """Counts the draw calls which reach the back buffer"""
+
+    draw_calls: int = 0
+
+    def run_draw_calls(self, rows=None) -> None:
+        self.draw_calls += len(self._draw_queue)
+        super().run_draw_calls(rows)
+
+
+def build_layout() -> Tuple[TUIElement, List[Button]]:
+    buttons = [
+        Button(None, label)
+        for label in [
+            "One",
+            "Two",
+            "Three",
+            "Four",
+            "Five",
+            "Six",
+            "Seven",
+            "Eight",
+            "Nine",
+            "Ten",
+        ]
+    ]
+    bottom_button_stack = Stack(
+        buttons,
+        Orientation.HORIZONTAL,
+        element_padding=1,
+        divider="│",
+    )
+
+    text_block = Text(
+        "Here is some text¶\nthat we would like to have wrap very nicely and not exceed our cute little text box area.\nAnd the text, just does not stop. Just goes on and on and on, and there might even be some tremendously exceptionally long words occassionally",
+        new_line_character_style=color_pair(0) | curses.A_DIM,
+    )
+    value_example = DataValue("Active Log", "generate_sums")
+    copyable_text_block = CopyableObject(
+        content=text_block, text_to_copy=text_block.text
+    )
+    content_stack = Stack(
+        [copyable_text_block, value_example],
+        orientation=Orientation.VERTICAL,
+    )
+    button_panel = Panel(
+        content_stack,
+        footer=bottom_button_stack,
+        header=Button(None, "Button Four"),
+    )
+    other_text_block = Text(
+        "This is some other text that will reside on the right side of the screen. sodfimeslietnsleijtlsidflsiefjseflseijflsiejf sljsielfjsliefjlsiejflsijelfijsliejflsijeflisjelf sleifjlsiejflisjelfijslfdlskvnlsd"
+    )
+    other_text_block_panel = Panel(other_text_block, footer=Button(None, "A button"))
+
+    side_by_side = Stack(
+        [button_panel, other_text_block_panel],
+        splits=[None, 35],
+        orientation=Orientation.HORIZONTAL,
+    )
+    return side_by_side, buttons
+
+
+async def count_frames(
+    width: int = 120, height: int = 40
+) -> List[Tuple[str, int, int, float]]:
+    """
+    Returns the draw calls, backend writes and time in milliseconds taken for
+    each benchmark frame
+    """
+    top_level_element, buttons = build_layout()
+    backend = CountingBackend(width, height)
+    window = CountingWindow(backend, top_level_element)
+
+    def hover_first_button() -> None:
+        buttons[0].hover = True
+
+    def move_hover() -> None:
+        buttons[0].hover = False
+        buttons[1].hover = True
+
+    def click_button() -> None:
+        buttons[1].clicked = True
+
+    frames = [
+        ("Initial frame", None),
+        ("Hover a button", hover_first_button),
+        ("Move the hover", move_hover),
+        ("Click a button", click_button),
+    ]
+
+    results = []
+    window.frame()
+    for name, change in frames:
+        if change is not None:
+            change()
+        window.draw_calls = 0
+        backend.writes = 0
+        start = time.perf_counter()
+        window.draw()
+        elapsed = (time.perf_counter() - start) * 1000
+        results.append((name, window.draw_calls, backend.writes, elapsed))
+    return results
+
+
+if __name__ == "__main__":
+    max_gaps = [0, TUIWindow.MAX_FLUSH_GAP]
+    results = []
+    for max_gap in max_gaps:
+        TUIWindow.MAX_FLUSH_GAP = max_gap
+        results.append(asyncio.run(count_frames()))
+
+    print(f"{'Frame':<16}{'Draw calls':>12}{'Writes (gap 0)':>16}{'Writes':>10}")
+    for (name, draw_calls, uncoalesced_writes, _), (_, _, coalesced_writes, _) in zip(
+        *results
+    ):
+        print(
+            f"{name:<16}{draw_calls:>12}{uncoalesced_writes:>16}{coalesced_writes:>10}"
+        )
+
+    sizes = [(80, 24), (120, 40), (240, 70)]
+    timings = [asyncio.run(count_frames(width, height)) for width, height in sizes]
+    print()
+    print(f"{'Frame (ms)':<16}" + "".join(f"{f'{w}x{h}':>10}" for w, h in sizes))
+    for frame_index, (name, *_) in enumerate(timings[0]):
+        print(
+            f"{name:<16}"
+            + "".join(f"{timing[frame_index][3]:>10.2f}" for timing in timings)
+        )
@@ -0,0 +1,230 @@
+from typing import Deque, List, Tuple, Optional
+
+from collections import deque
+import asyncio
+import os
+import signal
+import sys
+
+import curses
+
+from tuiform.screen import CellBuffer
+
+
+class Backend:
+    """
+    Everything a `TUIWindow` needs from the terminal it is drawing to. The
+    window only ever sends finished runs of cells (See `CellBuffer.diff`), so
+    a backend does not need to do any buffering of its own.
+
+    Keys and mouse buttons use the curses key codes and button states, no
+    matter which backend is being used.
+
+    Input is event driven: once `get_key` runs out of keys, the window awaits
+    `wait_for_input`, which only returns when the file descriptor from
+    `fileno` becomes readable, or when `notify_input` is called for input
+    which arrives some other way (Like a resize).
+    """
+
+    _input_waiter: Optional[asyncio.Future] = None
+    _resize_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get_size(self) -> Tuple[int, int]:
+        """Returns the (width, height) of the screen"""
+        raise NotImplementedError("`Backend`s must implement `get_size`")
+
+    def write(self, x: int, y: int, text: str, style: int = None) -> None:
+        raise NotImplementedError("`Backend`s must implement `write`")
+
+    def erase(self) -> None:
+        raise NotImplementedError("`Backend`s must implement `erase`")
+
+    def refresh(self) -> None:
+        """Called after the writes for a frame are done"""
+        pass
+
+    def get_key(self) -> int:
+        """Returns the next key code, or `curses.ERR` if there is no pending input"""
+        raise NotImplementedError("`Backend`s must implement `get_key`")
+
+    def get_mouse(self) -> Tuple[int, int, int]:
+        """Returns the (x, y, button state) for the last `curses.KEY_MOUSE` key"""
+        raise NotImplementedError("`Backend`s must implement `get_mouse`")
+
+    def fileno(self) -> Optional[int]:
+        """The file descriptor input is read from, if there is one"""
+        return None
+
+    def notify_input(self) -> None:
+        """Wakes up `wait_for_input`"""
+        if self._input_waiter is not None and not self._input_waiter.done():
+            self._input_waiter.set_result(None)
+
+    async def wait_for_input(self) -> None:
+        """Returns once there might be new input for `get_key`"""
+        loop = asyncio.get_running_loop()
+        self._input_waiter = loop.create_future()
+        fd = self.fileno()
+        if fd is not None:
+            loop.add_reader(fd, self.notify_input)
+        try:
+            await self._input_waiter
+        finally:
+            if fd is not None:
+                loop.remove_reader(fd)
+            self._input_waiter = None
+
+    def _add_resize_handler(self) -> None:
+        """
+        Calls `_on_resize` whenever the terminal is resized. This goes through
+        the running loop, since a plain signal handler would not wake it up
+        """
+        loop = asyncio.get_running_loop()
+        if self._resize_loop is loop:
+            return
+        loop.add_signal_handler(signal.SIGWINCH, self._on_resize)
+        self._resize_loop = loop
+
+    def _on_resize(self) -> None:
+        pass
+
+
+class CursesBackend(Backend):
+    screen: "curses._CursesWindow"
+
+    def __init__(self, screen: "curses._CursesWindow") -> None:
+        self.screen = screen
+
+    def get_size(self) -> Tuple[int, int]:
+        height, width = self.screen.getmaxyx()
+        return width, height
+
+    def write(self, x: int, y: int, text: str, style: int = None) -> None:
+        # Curses will fail if we try to draw to the bottom right corner of the
+        # screen, so we need to check if we are trying to do so, and just draw
+        # that character seperate
+        width, height = self.get_size()
+        if x + len(text) >= width and y >= height - 1:
+            last_x = x + len(text) - 1
+            if style is None:
+                try:
+                    self.screen.addstr(y, last_x, text[-1])
+                except curses.error:
+                    pass
+            else:
+                try:
+                    self.screen.addstr(y, last_x, text[-1], style)
+                except curses.error:
+                    pass
+            if len(text) == 1:
+                return
+            text = text[:-1]
+
+        if style is None:
+            self.screen.addstr(y, x, text)
+        else:
+            self.screen.addstr(y, x, text, style)
+
+    def erase(self) -> None:
+        self.screen.erase()  # Do not use clear(), as it will cause flickering artifacts
+
+    def refresh(self) -> None:
+        self.screen.refresh()
+
+    def get_key(self) -> int:
+        return self.screen.getch()
+
+    def get_mouse(self) -> Tuple[int, int, int]:
+        _, x, y, _, button = curses.getmouse()
+        return x, y, button
+
+    def fileno(self) -> Optional[int]:
+        return sys.stdin.fileno()
+
+    async def wait_for_input(self) -> None:
+        self._add_resize_handler()
+        await super().wait_for_input()
+
+    def _on_resize(self) -> None:
+        # Our handler replaces the one curses installs, so we need to tell
+        # curses about the new size ourselves. `resizeterm` also queues the
+        # `curses.KEY_RESIZE` for `getch`
+        width, height = os.get_terminal_size(sys.stdout.fileno())
+        curses.resizeterm(height, width)
+        self.notify_input()
+
+    def __repr__(self) -> str:
+        return f"CursesBackend(screen={self.screen})"
+
+
+class HeadlessBackend(Backend):
+    """
+    Keeps the screen as an in memory grid of cells instead of drawing to a
+    terminal, and reads its input from a script of keys and mouse events.
+    Nothing here touches curses, so layout, drawing and input handling can
+    run without a TTY (For tests, or for benchmarking frame times at any size).
+
+    Input can be queued up front, or from another task while the window is
+    running, which wakes up `wait_for_input`.
+    """
+
+    width: int
+    height: int
+    cells: CellBuffer
+
+    _input: Deque[Tuple[int, Optional[Tuple[int, int, int]]]]
+    _mouse: Tuple[int, int, int]
+
+    def __init__(self, width: int = 80, height: int = 24) -> None:
+        self.width = width
+        self.height = height
+        self.cells = CellBuffer(width, height)
+        self._input = deque()
+        self._mouse = (0, 0, 0)
+
+    def get_size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    def write(self, x: int, y: int, text: str, style: int = None) -> None:
+        self.cells.write(x, y, text, style)
+
+    def erase(self) -> None:
+        self.cells.clear()
+
+    def get_key(self) -> int:
+        if len(self._input) == 0:
+            return curses.ERR
+        key, mouse = self._input.popleft()
+        if mouse is not None:
+            self._mouse = mouse
+        return key
+
+    def get_mouse(self) -> Tuple[int, int, int]:
+        return self._mouse
+
+    def press_key(self, key: int | str) -> None:
+        """Queues a key, either as a key code or as a single character"""
+        if isinstance(key, str):
+            key = ord(key)
+        self._input.append((key, None))
+        self.notify_input()
+
+    def mouse_event(self, x: int, y: int, button: int) -> None:
+        """Queues a mouse event with a curses button state (Like `curses.BUTTON1_CLICKED`)"""
+        self._input.append((curses.KEY_MOUSE, (x, y, button)))
+        self.notify_input()
+
+    def resize(self, width: int, height: int) -> None:
+        """Changes the size of the screen, and queues a `curses.KEY_RESIZE`"""
+        self.width = width
+        self.height = height
+        self.cells = CellBuffer(width, height)
+        self._input.append((curses.KEY_RESIZE, None))
+        self.notify_input()
+
+    def lines(self) -> List[str]:
+        """Returns the characters currently on the screen, one string per row"""
+        return ["".join(row) for row in self.cells.characters]
+
+    def __repr__(self) -> str:
+        return f"HeadlessBackend(width={self.width}, height={self.height})"
@@ -1,23 +1,38 @@
-from typing import Callable, Awaitable, Tuple
+from typing import Callable, Awaitable, Optional, Tuple
 
+import asyncio
 import curses
 
-from tuiform.enums import NavigationInput
+from tuiform.enums import NavigationInput, EventType
+from tuiform.events import InputEvent
 from tuiform.element import TUIElement
+from tuiform.style import color_pair
 
 
 # TODO: Only handles single-line text, replace text here with the text wrap stuff
 class Button(TUIElement):
     IS_INTERACTABLE = True
+    PAINT_ATTRIBUTES = {"label", "hover", "clicked", "busy", "show_busy"}
+    INERT_ATTRIBUTES = {"bound_function", "selected", "cancel_on_click"}
 
     hover: bool
     selected: bool
     clicked: bool
+    busy: bool
+    # Whether to dim the button while its bound function is running
+    show_busy: bool
+    # Whether clicking the button while its bound function is running cancels
+    # it. Otherwise, the click is ignored
+    cancel_on_click: bool
+
+    _action: Optional[asyncio.Task]
 
     def __init__(
         self,
         bound_function: Callable[[], Awaitable[None]],
         label: str,
+        show_busy: bool = True,
+        cancel_on_click: bool = True,
     ):
         super().__init__()
         if "\n" in label:
@@ -26,8 +41,13 @@ class Button(TUIElement):
             )  # TODO: change this
         self.hover = False
         self.clicked = False
+        self.busy = False
         self.label = label
         self.bound_function = bound_function
+        self.show_busy = show_busy
+        self.cancel_on_click = cancel_on_click
+        self._action = None
+        self.subscribe(EventType.MOUSE, self.mouse_update)
 
     async def navigation_update(self, navigation_input: NavigationInput) -> None:
         if navigation_input is NavigationInput.NONE:
@@ -35,7 +55,7 @@ class Button(TUIElement):
 
         match navigation_input:
             case NavigationInput.INTERACT:
-                self.clicked = True
+                self.click()
                 return
 
         if self.parent is not None:
@@ -46,19 +66,19 @@ class Button(TUIElement):
     ) -> Tuple[int, int]:
         return super().get_size(width_constraint, height_constraint)
 
-    async def draw(self) -> None:
+    def draw(self) -> None:
         if not self.draw_frame.is_drawable:
             return
 
         style: int = None
-        if self.clicked:
-            style = curses.color_pair(1) | curses.A_REVERSE | curses.A_BOLD
+        if self.busy and self.show_busy:
+            style = color_pair(1) | curses.A_REVERSE | curses.A_DIM
+        elif self.clicked:
+            style = color_pair(1) | curses.A_REVERSE | curses.A_BOLD
         elif self.is_active() or self.hover:
-            style = (
-                curses.color_pair(1) | curses.A_BOLD | curses.A_REVERSE | curses.A_BOLD
-            )
+            style = color_pair(1) | curses.A_BOLD | curses.A_REVERSE | curses.A_BOLD
         else:
-            style = curses.color_pair(1) | curses.A_REVERSE
+            style = color_pair(1) | curses.A_REVERSE
 
         # Construct our button text
         width = self.draw_frame.width
@@ -81,53 +101,52 @@ class Button(TUIElement):
         t_pad = height // 2
         b_pad = height - t_pad
 
-        for i in range(t_pad):
-            self.draw_frame.draw(
-                0,
-                i,
-                " " * width,
-                style,
-            )
-
+        self.draw_frame.fill(0, 0, width, t_pad, " ", style)
         self.draw_frame.draw(
             0,
             t_pad,
             text,
             style,
         )
+        self.draw_frame.fill(0, t_pad + 1, width, b_pad, " ", style)
 
-        for i in range(b_pad):
-            self.draw_frame.draw(
-                0,
-                t_pad + 1 + i,
-                " " * width,
-                style,
-            )
-
-    async def update(
-        self, event_code: int, mouse_x: int, mouse_y: int, mouse_button: int
-    ) -> None:
+    async def mouse_update(self, event: InputEvent) -> None:
         if not self.draw_frame.is_drawable:
             return
-        if event_code == curses.KEY_MOUSE and self.draw_frame.contains(
-            mouse_x, mouse_y
-        ):
+        if self.draw_frame.contains(event.mouse_x, event.mouse_y):
             # Check if the mouse is within the bounds of the button
             self.hover = True
-            if mouse_button in [
-                curses.BUTTON1_PRESSED,
+            if event.mouse_button == curses.BUTTON1_PRESSED:
+                self.focus()
+            elif event.mouse_button in [
                 curses.BUTTON1_CLICKED,
                 curses.BUTTON1_RELEASED,
             ]:
-                self.clicked = True
+                # Only the end of a click counts, so that pressing and
+                # releasing does not run the bound function twice
+                self.click()
                 self.focus()
         else:
             self.hover = False
 
-    async def execute(self) -> None:
-        if self.clicked:
+    def click(self) -> None:
+        if self._action is not None:
+            if self.cancel_on_click:
+                self._action.cancel()
+            return
+        self.clicked = True
+        self._action = self.queue_action(self.run_bound_function)
+        self._action.add_done_callback(self._action_done)
+
+    async def run_bound_function(self) -> None:
+        self.busy = True
+        if self.bound_function is not None:
             await self.bound_function()
-            self.clicked = False
+
+    def _action_done(self, task: asyncio.Task) -> None:
+        self._action = None
+        self.busy = False
+        self.clicked = False
 
     async def select(self) -> None:
         self.focus()
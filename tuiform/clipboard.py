@@ -1,11 +1,13 @@
 import time
+import asyncio
 import curses
 from typing import Tuple
 import clipman
 
 from tuiform.element import TUIElement, DrawFrame
 from tuiform.screen import ScreenCoord
-from tuiform.enums import NavigationInput
+from tuiform.enums import NavigationInput, EventType
+from tuiform.events import InputEvent
 
 CLIPBOARD_AVAILABLE = False
 
@@ -18,15 +20,24 @@ except:
 
 class CopyableObject(TUIElement):
     IS_INTERACTABLE = True
+    LAYOUT_ATTRIBUTES = {"content"}
+    PAINT_ATTRIBUTES = {
+        "hovered",
+        "copied_timestamp",
+        "copy_button_style",
+        "copy_button_highlight_style",
+    }
+    INERT_ATTRIBUTES = {"text_to_copy", "selected"}
 
     COPY_ICON = "⧉"
     MESSAGE_DISPLAY_TIME = 1
 
-    copied: bool
     selected: bool
     hovered: bool
     copied_timestamp: float
 
+    _hide_message_handle: asyncio.TimerHandle
+
     def __init__(
         self,
         content: TUIElement,
@@ -43,8 +54,11 @@ class CopyableObject(TUIElement):
         self.copy_button_highlight_style = copy_button_highlight_style
         self.hovered = False
         self.selected = False
-        self.copied = False
         self.copied_timestamp = 0
+        self._hide_message_handle = None
+
+        self.add_child(self.content)
+        self.subscribe(EventType.MOUSE, self.mouse_update)
 
     def get_size(
         self, width_constraint: int | None = None, height_constraint: int | None = None
@@ -58,7 +72,7 @@ class CopyableObject(TUIElement):
 
         return content_width + 2, content_height
 
-    async def frame(self, draw_frame: DrawFrame) -> None:
+    def frame(self, draw_frame: DrawFrame) -> None:
         self.draw_frame = draw_frame
         if not self.draw_frame.is_drawable:
             return
@@ -70,7 +84,7 @@ class CopyableObject(TUIElement):
                 ScreenCoord(draw_frame.width - 3, draw_frame.height - 1),
             )
         )
-        await self.content.frame(wrapped_object_frame)
+        self.content.frame(wrapped_object_frame)
 
     async def navigation_update(self, navigation_input: NavigationInput) -> None:
         if navigation_input is NavigationInput.NONE:
@@ -78,12 +92,12 @@ class CopyableObject(TUIElement):
 
         match navigation_input:
             case NavigationInput.INTERACT:
-                self.copied = True
+                self.queue_action(self.copy)
 
         if self.parent is not None:
             await self.parent.navigation_update(navigation_input)
 
-    async def draw(self) -> None:
+    def draw(self) -> None:
         if not self.draw_frame.is_drawable:
             return
 
@@ -120,48 +134,49 @@ class CopyableObject(TUIElement):
                     z=1,
                 )
 
-        await self.content.draw()
+        self.content.draw()
 
-    async def update(
-        self, event_code: int, mouse_x: int, mouse_y: int, mouse_button: int
-    ) -> None:
+    async def mouse_update(self, event: InputEvent) -> None:
         if not self.draw_frame.is_drawable:
             return
 
-        if event_code == curses.KEY_MOUSE:
-            if self.draw_frame.contains(mouse_x, mouse_y) and mouse_button in [
+        if self.draw_frame.contains(event.mouse_x, event.mouse_y) and (
+            event.mouse_button
+            in [
+                curses.BUTTON1_PRESSED,
+                curses.BUTTON1_CLICKED,
+                curses.BUTTON1_RELEASED,
+            ]
+        ):
+            self.selected = True
+
+        local_x, local_y = self.draw_frame.local(event.mouse_x, event.mouse_y)
+        if local_x == self.draw_frame.width - 1 and local_y == 0:
+            self.hovered = True
+            if event.mouse_button in [
                 curses.BUTTON1_PRESSED,
                 curses.BUTTON1_CLICKED,
                 curses.BUTTON1_RELEASED,
             ]:
-                self.selected = True
-
-            local_x, local_y = self.draw_frame.local(mouse_x, mouse_y)
-            if local_x == self.draw_frame.width - 1 and local_y == 0:
-                self.hovered = True
-                if mouse_button in [
-                    curses.BUTTON1_PRESSED,
-                    curses.BUTTON1_CLICKED,
-                    curses.BUTTON1_RELEASED,
-                ]:
-                    self.copied = True
-            else:
-                self.hovered = False
-
-        await self.content.update(
-            event_code=event_code,
-            mouse_x=mouse_x,
-            mouse_y=mouse_y,
-            mouse_button=mouse_button,
+                self.queue_action(self.copy)
+        else:
+            self.hovered = False
+
+    async def copy(self) -> None:
+        self.copied_timestamp = time.time()
+        # Our draw calls are cached, so we need to clear the timestamp in
+        # order for the copied message to be taken down
+        if self._hide_message_handle is not None:
+            self._hide_message_handle.cancel()
+        self._hide_message_handle = asyncio.get_running_loop().call_later(
+            CopyableObject.MESSAGE_DISPLAY_TIME, self._hide_message
         )
+        if CLIPBOARD_AVAILABLE:
+            clipman.set(self.text_to_copy)
 
-    async def execute(self) -> None:
-        if self.copied:
-            self.copied = False
-            self.copied_timestamp = time.time()
-            if CLIPBOARD_AVAILABLE:
-                clipman.set(self.text_to_copy)
-        await self.content.execute()
+    def _hide_message(self) -> None:
+        self._hide_message_handle = None
+        self.copied_timestamp = 0
 
     def __repr__(self) -> str:
         return f"CopyableText(content={self.content}, text_to_copy={repr(self.text_to_copy)}, copy_button_style={self.copy_button_style})"
@@ -1,51 +1,157 @@
-from typing import Tuple, Optional, List, Sequence, Any
+from typing import (
+    Tuple,
+    Optional,
+    List,
+    Sequence,
+    Any,
+    Callable,
+    Awaitable,
+    Set,
+    Dict,
+    Iterable,
+    Hashable,
+    Deque,
+)
 
 import asyncio
+import functools
+import inspect
+from collections import OrderedDict, deque
 from os import environ
 
 import curses
 
-from tuiform.screen import ScreenCoord
-from tuiform.enums import NavigationInput, Orientation
-
-
-async def await_getch(screen: "curses._CursesWindow") -> int:
-    while True:
-        key = screen.getch()
-        if key != curses.ERR:
-            return key
-        await asyncio.sleep(0.025)
+from tuiform.screen import (
+    ScreenCoord,
+    CellBuffer,
+    HitIndex,
+    DrawQueue,
+    regions_intersect,
+    region_contains,
+    merge_regions,
+    union_region,
+)
+from tuiform.enums import (
+    NavigationInput,
+    Orientation,
+    Invalidation,
+    EventType,
+    DrawOp,
+)
+from tuiform.backend import Backend, CursesBackend
+from tuiform.events import InputEvent, EventBus, await_events
 
 
 class TUIWindow:
-    screen: "curses._CursesWindow"
+    # The number of unchanged cells we are willing to rewrite in order to
+    # join two changed runs of cells into a single call to curses
+    MAX_FLUSH_GAP: int = 8
+
+    # The most frames drawn per second. Every invalidation made while waiting
+    # for the next frame is drawn together in that frame
+    max_fps: Optional[float]
+    _max_concurrent_actions: int
+    # How long the terminal size has to stay the same after a resize before
+    # the window is laid out again, in seconds
+    resize_delay: float
+    # The number of terminal sizes to keep complete layouts for, so that
+    # switching back to an earlier size does not lay everything out again
+    MAX_CACHED_LAYOUTS: int = 4
+    # Elements making at least this many draw calls have them put into a
+    # `HitIndex`, so that replaying part of the element only looks at the
+    # draw calls inside of the damage
+    INDEXED_DRAW_CALLS: int = 16
+    events: EventBus
+
+    backend: Backend
     top_level_element: "TUIElement"
     bounds: Tuple[ScreenCoord, ScreenCoord]
     resize: bool
 
-    _needs_redraw: bool
-    _pending_draws: List[List[Tuple[ScreenCoord, str, int]]]
+    _draw_queue: DrawQueue
+    _back_buffer: CellBuffer
+    _front_buffer: CellBuffer
+    _draw_recording: Optional[List["Tuple | TUIElement"]]
+    _drawing_element: Optional["TUIElement"]
+    _damaged_regions: List[Tuple[ScreenCoord, ScreenCoord]]
     _focused_elements: List["TUIElement"]
     _active_element: "TUIElement"
     _screen_size: Tuple[int, int]
     _screen_padding: Tuple[int, int, int, int]
+    _redraw_requested: asyncio.Event
+    _hit_index: HitIndex
+    _event_routing_stale: bool
+    # Incremented every time the routing is rebuilt from the element tree.
+    # Elements routed since then can have their subscriptions and frame
+    # changes applied to the routing directly
+    _routing_generation: int
+    _hovered_elements: List["TUIElement"]
+    _running_actions: Set[asyncio.Task]
+    # How many actions are running, and the queued actions waiting for one of
+    # them to finish, in order
+    _running_action_count: int
+    _action_waiters: Deque[asyncio.Future]
+    _action_failure: Optional[asyncio.Future]
+    _executors: List["TUIElement"]
+    _focus_order: List["TUIElement"]
+    _focus_order_stale: bool
+    _last_draw_time: float
+    _resize_handle: Optional[asyncio.TimerHandle]
+    _needs_reframe: bool
+    _layout_unsaved: bool
+    # Terminal size -> (layout generation, [(element, draw frame, state)])
+    _layouts: "OrderedDict[Tuple[int, int], Tuple[int, List[Tuple[TUIElement, DrawFrame, Any]]]]"
+    # Incremented by every layout invalidation, which makes cached layouts
+    # from before it stale
+    _layout_generation: int
 
     def __init__(
         self,
-        screen: "curses._CursesWindow",
+        backend: "Backend | curses._CursesWindow",
         top_level_element: "TUIElement",
         bounds: Tuple[ScreenCoord, ScreenCoord] = None,
         resize: bool = True,
+        max_fps: Optional[float] = 60,
+        max_concurrent_actions: int = 4,
+        resize_delay: float = 0.05,
     ) -> None:
+        if not isinstance(backend, Backend):
+            backend = CursesBackend(backend)
         self.top_level_element = top_level_element
-        self.screen = screen
+        self.backend = backend
 
-        self._pending_draws = []
+        self._draw_queue = DrawQueue()
         self._screen_size = None
         self._resize = True
         self._focused_elements = []
         self._active_element = None  # TODO: focus an element here
-        self._needs_redraw = False
+        self._back_buffer = CellBuffer(self.screen_width, self.screen_height)
+        self._front_buffer = CellBuffer(self.screen_width, self.screen_height)
+        self._draw_recording = None
+        self._drawing_element = None
+        self._damaged_regions = []
+        self._redraw_requested = asyncio.Event()
+        self._last_draw_time = 0
+        self.max_fps = max_fps
+        self.events = EventBus()
+        self._hit_index = HitIndex()
+        self._event_routing_stale = True
+        self._routing_generation = 0
+        self._hovered_elements = []
+        self._running_actions = set()
+        self._running_action_count = 0
+        self._action_waiters = deque()
+        self.max_concurrent_actions = max_concurrent_actions
+        self._action_failure = None
+        self._executors = []
+        self._focus_order = []
+        self._focus_order_stale = True
+        self.resize_delay = resize_delay
+        self._resize_handle = None
+        self._needs_reframe = False
+        self._layout_unsaved = False
+        self._layouts = OrderedDict()
+        self._layout_generation = 0
 
         if bounds is None:
             bounds = (
@@ -64,52 +170,432 @@ class TUIWindow:
     def schedule_draw(
         self, position: ScreenCoord, text: str, style: int = None, z: int = 0
     ) -> None:
-        if z + 1 > len(self._pending_draws):
-            self._pending_draws.extend(
-                [[] for _ in range(z + 1 - len(self._pending_draws))]
-            )
-        self._pending_draws[z].append((position, text, style))
+        if self._draw_recording is not None:
+            if len(text) > 0:
+                self._draw_recording.append(
+                    (
+                        DrawOp.TEXT,
+                        (position, ScreenCoord(position.x + len(text) - 1, position.y)),
+                        text,
+                        style,
+                        z,
+                    )
+                )
+            return
+        self._draw_queue.push(position.x, position.y, text, style, z)
 
-    def run_draw_calls(self) -> None:
-        for draw_layer in self._pending_draws:
-            for draw_call in draw_layer:
-                pos, text, style = draw_call
-                self.run_draw_call(pos.x, pos.y, text, style)
-        self._pending_draws = []
+    def schedule_fill(
+        self,
+        region: Tuple[ScreenCoord, ScreenCoord],
+        character: str,
+        style: int = None,
+        z: int = 0,
+    ) -> None:
+        """Schedules filling every cell of `region` with `character`"""
+        if self._draw_recording is not None:
+            self._draw_recording.append((DrawOp.FILL, region, character, style, z))
+            return
+        text = character * (region[1].x - region[0].x + 1)
+        for y in range(region[0].y, region[1].y + 1):
+            self._draw_queue.push(region[0].x, y, text, style, z)
+
+    def damage(self, region: Tuple[ScreenCoord, ScreenCoord]) -> None:
+        """Marks a region of the screen to be repainted on the next draw"""
+        self._damaged_regions.append(region)
+        self.request_redraw()
+
+    def request_redraw(self) -> None:
+        """
+        Schedules a draw for the next frame. Elements request this themselves
+        when they are invalidated, so this is only needed when drawing for
+        some other reason.
+        """
+        self._redraw_requested.set()
+
+    async def render_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._redraw_requested.wait()
+            if self.max_fps is not None:
+                delay = self._last_draw_time + 1 / self.max_fps - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self._redraw_requested.clear()
+            # The layout does not fit the terminal until the resize is handled
+            if self._resize_handle is not None:
+                continue
+            self._last_draw_time = loop.time()
+            if self._needs_reframe:
+                self._needs_reframe = False
+                self.frame()
+            self.draw()
+
+    def run_draw_calls(self, rows: Iterable[int] = None) -> None:
+        # Draw calls only touch the back buffer, the terminal is updated with
+        # whatever actually changed since the last frame once they are done
+        queue = self._draw_queue
+        if queue.max_z > 0:
+            self._run_occluded_draw_calls()
+        else:
+            write = self._back_buffer.write
+            xs, ys, texts, styles = queue.xs, queue.ys, queue.texts, queue.styles
+            for index in range(queue.count):
+                write(xs[index], ys[index], texts[index], styles[index])
+        queue.clear()
+
+        for x, y, text, style in self._back_buffer.diff(
+            self._front_buffer, rows, max_gap=TUIWindow.MAX_FLUSH_GAP
+        ):
+            self.run_draw_call(x, y, text, style)
+        self._front_buffer.copy_from(self._back_buffer, rows)
+        self.backend.refresh()
+
+    def _run_occluded_draw_calls(self) -> None:
+        """
+        Writes the pending draw calls into the back buffer from the top layer
+        down, trimming every call to the cells which are not covered by a
+        higher layer. Draw calls always replace every cell they cover, so
+        anything underneath a higher layer would just be overwritten anyway.
+        """
+        queue = self._draw_queue
+        covered: Dict[int, List[Tuple[int, int]]] = {}  # Row -> covered spans
+        for z, draw_layer in queue.layers():
+            layer_spans: Dict[int, List[Tuple[int, int]]] = {}
+            for index in draw_layer:
+                x, y = queue.xs[index], queue.ys[index]
+                text, style = queue.texts[index], queue.styles[index]
+                left, right = x, x + len(text) - 1
+                if right < left:
+                    continue
+                if z > 0:
+                    layer_spans.setdefault(y, []).append((left, right))
+
+                row_covered = covered.get(y)
+                if row_covered is None:
+                    self._back_buffer.write(left, y, text, style)
+                    continue
+
+                # Write the parts of the call which fall between the covered
+                # spans of this row
+                for covered_left, covered_right in row_covered:
+                    if covered_right < left:
+                        continue
+                    if covered_left > right:
+                        break
+                    if covered_left > left:
+                        self._back_buffer.write(
+                            left,
+                            y,
+                            text[left - x : covered_left - x],
+                            style,
+                        )
+                    left = covered_right + 1
+                    if left > right:
+                        break
+                if left <= right:
+                    self._back_buffer.write(
+                        left, y, text[left - x : right - x + 1], style
+                    )
+
+            for y, spans in layer_spans.items():
+                spans.extend(covered.get(y, []))
+                spans.sort()
+                merged = [spans[0]]
+                for left, right in spans[1:]:
+                    if left <= merged[-1][1] + 1:
+                        merged[-1] = (merged[-1][0], max(merged[-1][1], right))
+                    else:
+                        merged.append((left, right))
+                covered[y] = merged
 
     def run_draw_call(self, x: int, y: int, text: str, style: int = None) -> None:
-        # Curses will fail if we try to draw to the bottom right corner of the
-        # screen, so we need to check if we are trying to do so, and just draw
-        # that character seperate
-        if x + len(text) >= self.screen_width and y >= self.screen_height - 1:
-            if style is None:
-                try:
-                    self.screen.addstr(y, x, text[-1])
-                except curses.error:
-                    pass
+        self.backend.write(x, y, text, style)
+
+    def draw(self) -> None:
+        # Regions damaged through `damage` are repainted even if nothing changed
+        if not self.top_level_element.is_dirty and len(self._damaged_regions) == 0:
+            return
+
+        self.update_element(self.top_level_element)
+        if self._layout_unsaved:
+            self._layout_unsaved = False
+            self._layouts[(self.screen_width, self.screen_height)] = (
+                self._layout_generation,
+                self.save_layout(),
+            )
+            if len(self._layouts) > self.MAX_CACHED_LAYOUTS:
+                self._layouts.popitem(last=False)
+
+        # Only the damaged regions of the back buffer are repainted, everything
+        # else is left as it was at the end of the previous draw
+        screen_bounds = (
+            ScreenCoord(0, 0),
+            ScreenCoord(self.screen_width - 1, self.screen_height - 1),
+        )
+        regions = merge_regions(self._damaged_regions, screen_bounds)
+        self._damaged_regions = []
+        if len(regions) == 0:
+            return
+
+        rows = set()
+        for region in regions:
+            self._back_buffer.clear(region)
+            rows.update(range(region[0].y, region[1].y + 1))
+        self.replay_draw_calls(self.top_level_element, regions)
+        self.run_draw_calls(sorted(rows))
+
+    def update_element(self, element: "TUIElement") -> None:
+        """
+        Walks the dirty paths below `element`, reframing the elements which
+        need layout and recording the draw calls of the ones which need
+        painting. Clean subtrees are not visited.
+        """
+        if element._needs_layout:
+            element.frame(element.draw_frame)
+        if element._needs_paint:
+            self.record_draw_calls(element)
+
+        dirty_children = element._dirty_children
+        element._dirty_children = None
+        if dirty_children is not None:
+            for child in dirty_children:
+                # Children can be removed after they were invalidated
+                if child.parent is not element or not child.is_dirty:
+                    continue
+                previous_extent = child._subtree_extent
+                self.update_element(child)
+                if child._draw_position is not None and not (
+                    child._subtree_extent == previous_extent
+                ):
+                    self.child_extent_changed(element, child, previous_extent)
+        # Something below was drawn again, so the flattened list is stale
+        element._display_list = None
+
+    def child_extent_changed(
+        self,
+        element: "TUIElement",
+        child: "TUIElement",
+        previous_extent: Optional[Tuple[ScreenCoord, ScreenCoord]],
+    ) -> None:
+        """
+        Updates the extent and the draw call index of `element` after a child
+        it draws was drawn again somewhere else, without going through the
+        rest of its draw calls unless the extent of `element` has to shrink
+        """
+        extent = child._subtree_extent
+        if element._draw_index is not None:
+            if previous_extent is not None:
+                element._draw_index.remove(previous_extent, child._draw_position)
+            if extent is not None:
+                element._draw_index.add(extent, child._draw_position)
+
+        element_extent = element._subtree_extent
+        if (
+            previous_extent is not None
+            and element_extent is not None
+            and (
+                previous_extent[0].x == element_extent[0].x
+                or previous_extent[0].y == element_extent[0].y
+                or previous_extent[1].x == element_extent[1].x
+                or previous_extent[1].y == element_extent[1].y
+            )
+            and (extent is None or not region_contains(extent, previous_extent))
+        ):
+            # The child may have been the only thing reaching that edge
+            element._subtree_extent = self.draw_calls_extent(element._draw_calls)
+        elif extent is not None and (
+            element_extent is None or not region_contains(element_extent, extent)
+        ):
+            element._subtree_extent = union_region(element_extent, extent)
+
+    def record_draw_calls(self, element: "TUIElement") -> None:
+        """
+        Runs the draw logic of `element`, and stores the draw calls it makes on
+        the element. The regions covered by both the old and the new draw
+        calls are damaged.
+        """
+        previous_recording = element._draw_calls
+        recording = []
+        parent_recording = self._draw_recording
+        parent_element = self._drawing_element
+        self._draw_recording = recording
+        self._drawing_element = element
+        try:
+            if element.draw_frame.is_drawable:
+                element.draw()
+        finally:
+            self._draw_recording = parent_recording
+            self._drawing_element = parent_element
+        element._draw_calls = recording
+        element._needs_paint = False
+        element._subtree_extent = self.draw_calls_extent(recording)
+        element._display_list = None
+        self.index_draw_calls(element, previous_recording)
+
+        for draw_call in recording:
+            if not isinstance(draw_call, TUIElement):
+                self.damage(draw_call[1])
+        if previous_recording is not None:
+            still_drawn = set(
+                id(draw_call)
+                for draw_call in recording
+                if isinstance(draw_call, TUIElement)
+            )
+            for draw_call in previous_recording:
+                if not isinstance(draw_call, TUIElement):
+                    self.damage(draw_call[1])
+                elif (
+                    id(draw_call) not in still_drawn
+                    and draw_call._subtree_extent is not None
+                ):
+                    # Children we no longer draw leave their draw calls behind
+                    self.damage(draw_call._subtree_extent)
+
+    def index_draw_calls(
+        self,
+        element: "TUIElement",
+        previous_recording: Optional[List["Tuple | TUIElement"]],
+    ) -> None:
+        """
+        Notes the position of each child in the new draw calls of `element`,
+        and puts the draw calls into a `HitIndex` by position if there are
+        enough of them (See `INDEXED_DRAW_CALLS`)
+        """
+        if previous_recording is not None:
+            for draw_call in previous_recording:
+                if isinstance(draw_call, TUIElement):
+                    draw_call._draw_position = None
+
+        recording = element._draw_calls
+        index = None
+        if len(recording) >= self.INDEXED_DRAW_CALLS:
+            index = HitIndex()
+        for position, draw_call in enumerate(recording):
+            if isinstance(draw_call, TUIElement):
+                if draw_call._draw_position is not None:
+                    # Only one position can be kept up to date for a child
+                    # which is drawn twice, so go without the index
+                    index = None
+                draw_call._draw_position = position
+                region = draw_call._subtree_extent
             else:
-                try:
-                    self.screen.addstr(y, x, text[-1], style)
-                except curses.error:
-                    pass
-            if len(text) == 1:
-                return
-            text = text[:-1]
+                region = draw_call[1]
+            if index is not None and region is not None:
+                index.add(region, position)
+        element._draw_index = index
+
+    def compile_display_list(self, element: "TUIElement") -> List[Tuple]:
+        """
+        Returns the recorded draw calls of `element` flattened into one list,
+        with the display lists of the children it draws spliced in. Lists are
+        only compiled when a subtree is replayed in full, and are kept until
+        something in the subtree is drawn again.
+        """
+        if element._display_list is None:
+            display_list = []
+            if element._draw_calls is not None:
+                for draw_call in element._draw_calls:
+                    if isinstance(draw_call, TUIElement):
+                        display_list.extend(self.compile_display_list(draw_call))
+                    else:
+                        display_list.append(draw_call)
+            element._display_list = display_list
+        return element._display_list
 
-        if style is None:
-            self.screen.addstr(y, x, text)
+    def replay_draw_calls(
+        self,
+        element: "TUIElement",
+        regions: List[Tuple[ScreenCoord, ScreenCoord]] = None,
+    ) -> None:
+        """
+        Schedules the recorded draw calls of `element` and its descendants. If
+        `regions` is provided, draw calls are clipped to those regions, and
+        subtrees which do not draw inside of them are skipped. Subtrees lying
+        entirely inside of a region are scheduled from their display list.
+        """
+        extent = element._subtree_extent
+        if element._draw_calls is None or extent is None:
+            return
+        if regions is None:
+            regions = [extent]
         else:
-            self.screen.addstr(y, x, text, style)
+            regions = [
+                region for region in regions if regions_intersect(extent, region)
+            ]
+            if len(regions) == 0:
+                return
 
-    async def draw(self) -> None:
-        if self._needs_redraw:
-            self.screen.erase()  # Do not use clear(), as it will cause flickering artifacts
-            await self.top_level_element.draw()
-            self.run_draw_calls()
-            self._needs_redraw = False
+        push = self._draw_queue.push
+        if len(regions) == 1 and region_contains(regions[0], extent):
+            # Nothing needs clipping, so the whole subtree goes out in one loop
+            for operation, (start, end), content, style, z in self.compile_display_list(
+                element
+            ):
+                if operation is DrawOp.TEXT:
+                    push(start.x, start.y, content, style, z)
+                else:
+                    text = content * (end.x - start.x + 1)
+                    for y in range(start.y, end.y + 1):
+                        push(start.x, y, text, style, z)
+            return
+
+        draw_calls = element._draw_calls
+        if element._draw_index is not None:
+            positions = set()
+            for region in regions:
+                positions.update(element._draw_index.overlapping(region))
+            draw_calls = [draw_calls[position] for position in sorted(positions)]
+        for draw_call in draw_calls:
+            if isinstance(draw_call, TUIElement):
+                self.replay_draw_calls(draw_call, regions)
+                continue
+            operation, (start, end), content, style, z = draw_call
+            for region_start, region_end in regions:
+                top = max(start.y, region_start.y)
+                bottom = min(end.y, region_end.y)
+                left = max(start.x, region_start.x)
+                right = min(end.x, region_end.x)
+                if top > bottom or left > right:
+                    continue
+                if operation is DrawOp.TEXT:
+                    push(
+                        left,
+                        top,
+                        content[left - start.x : right - start.x + 1],
+                        style,
+                        z,
+                    )
+                else:
+                    text = content * (right - left + 1)
+                    for y in range(top, bottom + 1):
+                        push(left, y, text, style, z)
+
+    def draw_calls_extent(
+        self, draw_calls: Optional[List["Tuple | TUIElement"]]
+    ) -> Optional[Tuple[ScreenCoord, ScreenCoord]]:
+        """Returns the region covered by some recorded draw calls and their children"""
+        extent = None
+        if draw_calls is None:
+            return extent
+        for draw_call in draw_calls:
+            if isinstance(draw_call, TUIElement):
+                extent = union_region(extent, draw_call._subtree_extent)
+            else:
+                extent = union_region(extent, draw_call[1])
+        return extent
 
-    async def frame(self) -> None:
+    def frame(self) -> None:
         self._screen_size = None
+        if (
+            self._front_buffer.width != self.screen_width
+            or self._front_buffer.height != self.screen_height
+        ):
+            # We no longer know what is on the terminal, so start from a blank
+            # screen and let the next flush repaint everything
+            self.backend.erase()
+            self._back_buffer = CellBuffer(self.screen_width, self.screen_height)
+            self._front_buffer = CellBuffer(self.screen_width, self.screen_height)
+
         new_bounds = (
             ScreenCoord(
                 self._screen_padding[3],
@@ -121,49 +607,347 @@ class TUIWindow:
             ),
         )
         self.bounds = new_bounds
-        top_level_draw_frame = DrawFrame(self, bounds=self.bounds)
-        await self.top_level_element.frame(top_level_draw_frame)
-        self._needs_redraw = True
+
+        screen_size = (self.screen_width, self.screen_height)
+        cached_layout = self._layouts.get(screen_size)
+        if cached_layout is not None and cached_layout[0] == self._layout_generation:
+            self._layouts.move_to_end(screen_size)
+            self.restore_layout(cached_layout[1])
+        else:
+            top_level_draw_frame = DrawFrame(self, bounds=self.bounds)
+            self.top_level_element.frame(top_level_draw_frame)
+            # Dirty elements below the top are only laid out on the next draw
+            self._layout_unsaved = True
+        self.damage(
+            (
+                ScreenCoord(0, 0),
+                ScreenCoord(self.screen_width - 1, self.screen_height - 1),
+            )
+        )
+
+    def save_layout(self) -> List[Tuple["TUIElement", "DrawFrame", Any]]:
+        """Returns the frames and layout state of every element in the tree"""
+        layout = []
+        elements = [self.top_level_element]
+        while len(elements) > 0:
+            element = elements.pop()
+            layout.append((element, element.draw_frame, element._layout_state()))
+            if element.children is not None:
+                elements.extend(element.children)
+        return layout
+
+    def restore_layout(
+        self, layout: List[Tuple["TUIElement", "DrawFrame", Any]]
+    ) -> None:
+        """Puts every element back into a layout from `save_layout`"""
+        for element, draw_frame, state in layout:
+            if draw_frame is not element.draw_frame:
+                element.draw_frame = draw_frame
+                element.window = draw_frame.window
+            element._restore_layout_state(state)
+
+    def invalidate_layouts(self) -> None:
+        self._layout_generation += 1
+
+    def schedule_reframe(self) -> None:
+        """
+        Lays the window out again once `resize_delay` has passed without
+        another call, so that a burst of resizes is only handled once
+        """
+        if self._resize_handle is not None:
+            self._resize_handle.cancel()
+        self._resize_handle = asyncio.get_running_loop().call_later(
+            self.resize_delay, self._resize_settled
+        )
+
+    def _resize_settled(self) -> None:
+        self._resize_handle = None
+        self._needs_reframe = True
+        self.request_redraw()
 
     async def start(self) -> None:
-        await self.frame()
+        self.frame()
         self.top_level_element.focus()
+
+        # Input only updates the elements, drawing happens on its own
+        # schedule in the render loop
+        render_task = asyncio.create_task(self.render_loop())
+        input_task = asyncio.create_task(self.input_loop())
+        self._action_failure = asyncio.get_running_loop().create_future()
+        try:
+            done, _ = await asyncio.wait(
+                [render_task, input_task, self._action_failure],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                task.result()
+        finally:
+            render_task.cancel()
+            input_task.cancel()
+            for task in self._running_actions:
+                task.cancel()
+            self._action_failure = None
+
+    async def input_loop(self) -> None:
         while True:
-            key = await await_getch(self.screen)
-            self.screen.addstr(0, 0, f"Key: {key}")
-
-            mouse_x, mouse_y, mouse_button = None, None, None
-            if key == curses.KEY_RESIZE:
-                await self.frame()
-            elif key == curses.KEY_MOUSE:
-                _, x, y, _, button = curses.getmouse()
-                mouse_x, mouse_y, mouse_button = x, y, button
-                self.screen.addstr(1, 0, f"Mouse info: {x}, {y} - {button}")
-            elif key == ord("q"):  # TODO: change this to check for the ctrc
-                break
+            for event in await await_events(self.backend):
+                if event.key == ord("q"):  # TODO: change this to check for the ctrc
+                    return
+                await self.handle_event(event)
+
+    async def handle_event(self, event: InputEvent) -> None:
+        self.backend.write(0, 0, f"Key: {event.key}")
+        if event.key == curses.KEY_RESIZE:
+            self.schedule_reframe()
+        elif event.key == curses.KEY_MOUSE:
+            self.backend.write(
+                0,
+                1,
+                f"Mouse info: {event.mouse_x}, {event.mouse_y} - {event.mouse_button}",
+            )
 
-            if self._active_element is None:
-                self.top_level_element.focus()
+        if self._active_element is None:
+            self.top_level_element.focus()
+
+        if self._event_routing_stale:
+            self._rebuild_event_routing()
+        if event.key == curses.KEY_MOUSE:
+            # Mouse events only go to the elements under the pointer, and to
+            # the elements the pointer just left, so that they can drop
+            # their hover
+            targets = self._hit_index.at(event.mouse_x, event.mouse_y)
+            for element in self._hovered_elements:
+                if not element in targets:
+                    await element.dispatch_mouse_event(event)
+            for element in targets:
+                await element.dispatch_mouse_event(event)
+            self._hovered_elements = targets
+        else:
+            await self.events.dispatch(event.key, event)
+            await self.events.dispatch(EventType.KEY, event)
+            if event.key == curses.KEY_RESIZE:
+                await self.events.dispatch(EventType.RESIZE, event)
+        if not self._active_element is None:
+            # TODO: this is also very janky
+            await self._active_element.navigation_update(
+                NavigationInput.from_key_code(event.key)
+            )
+        await self.run_executors()
 
-            await self.top_level_element.update(key, mouse_x, mouse_y, mouse_button)
-            if not self._active_element is None:
-                # TODO: this is also very janky
-                prev_active_element = self._active_element
-                await self._active_element.navigation_update(
-                    NavigationInput.from_key_code(key)
-                )
-                if not self._active_element is prev_active_element:
-                    self._needs_redraw = True
-            await self.top_level_element.execute()
-            await self.draw()
+    async def dispatch_event(self, event: Hashable, *args: Any) -> None:
+        """Calls every handler subscribed to `event` with `args`"""
+        if self._event_routing_stale:
+            self._rebuild_event_routing()
+        await self.events.dispatch(event, *args)
+
+    def queue_action(self, action: Callable[[], Awaitable[None]]) -> asyncio.Task:
+        """
+        Runs `action` in its own task, so that slow actions do not hold up
+        input or drawing. At most `max_concurrent_actions` run at once, the
+        rest wait for their turn. Returns the task, which can be cancelled.
+        """
+        task = asyncio.create_task(self._run_action(action))
+        self._running_actions.add(task)
+        task.add_done_callback(self._action_finished)
+        return task
+
+    async def _run_action(self, action: Callable[[], Awaitable[None]]) -> None:
+        if (
+            self._running_action_count >= self._max_concurrent_actions
+            or len(self._action_waiters) > 0
+        ):
+            waiter = asyncio.get_running_loop().create_future()
+            self._action_waiters.append(waiter)
+            try:
+                # Counted as running by `_start_waiting_actions` before waking up
+                await waiter
+            except asyncio.CancelledError:
+                if not waiter.cancelled():
+                    self._running_action_count -= 1
+                    self._start_waiting_actions()
+                raise
+        else:
+            self._running_action_count += 1
+
+        try:
+            await action()
+        finally:
+            self._running_action_count -= 1
+            self._start_waiting_actions()
+
+    def _start_waiting_actions(self) -> None:
+        while (
+            len(self._action_waiters) > 0
+            and self._running_action_count < self._max_concurrent_actions
+        ):
+            waiter = self._action_waiters.popleft()
+            if waiter.done():
+                continue  # Cancelled while waiting
+            self._running_action_count += 1
+            waiter.set_result(None)
+
+    def _action_finished(self, task: asyncio.Task) -> None:
+        self._running_actions.discard(task)
+        if (
+            task.cancelled()
+            or self._action_failure is None
+            or self._action_failure.done()
+        ):
+            return
+        # Actions failing should stop the window, just like any other error
+        exception = task.exception()
+        if exception is not None:
+            self._action_failure.set_exception(exception)
+
+    async def run_executors(self) -> None:
+        if self._event_routing_stale:
+            self._rebuild_event_routing()
+        for element in self._executors:
+            await element.execute()
+
+    def invalidate_event_routing(self) -> None:
+        """Makes the window collect the subscriptions of its elements again"""
+        self._event_routing_stale = True
+
+    def _is_routed(self, element: "TUIElement") -> bool:
+        return (
+            not self._event_routing_stale
+            and element._routing_generation == self._routing_generation
+        )
+
+    def route_subscription(
+        self,
+        element: "TUIElement",
+        event: Hashable,
+        handler: Callable[..., Awaitable[None]],
+    ) -> None:
+        """Adds a new subscription of `element` to the routing"""
+        if not self._is_routed(element):
+            return  # Picked up when the routing is rebuilt
+        if event is EventType.MOUSE:
+            self.reindex_element(element)
+        else:
+            self.events.subscribe(event, handler)
+
+    def unroute_subscription(
+        self,
+        element: "TUIElement",
+        event: Hashable,
+        handler: Callable[..., Awaitable[None]],
+    ) -> None:
+        """Removes a subscription of `element` from the routing"""
+        if not self._is_routed(element):
+            return
+        if event is EventType.MOUSE:
+            self.reindex_element(element)
+        else:
+            self.events.unsubscribe(event, handler)
+
+    def reindex_element(self, element: "TUIElement") -> None:
+        """
+        Moves `element` to its current frame in the hit index, after its frame
+        or its mouse subscriptions change
+        """
+        if not self._is_routed(element):
+            return
+        if element._hit_region is not None:
+            self._hit_index.remove(element._hit_region, element)
+            element._hit_region = None
+        if (
+            element._subscriptions is not None
+            and EventType.MOUSE in element._subscriptions
+            and element.draw_frame.is_drawable
+        ):
+            element._hit_region = element.draw_frame.bounds
+            self._hit_index.add(element._hit_region, element)
+
+    def invalidate_focus_order(self) -> None:
+        self._focus_order_stale = True
+
+    @property
+    def focus_order(self) -> List["TUIElement"]:
+        """
+        Every element which can become active, in the order that focus moves
+        through them. Rebuilt lazily after the element tree or its frames
+        change.
+        """
+        if self._focus_order_stale:
+            self._focus_order = []
+            self._order_focus(self.top_level_element, None)
+            self._focus_order_stale = False
+        return self._focus_order
+
+    @property
+    def max_concurrent_actions(self) -> int:
+        """
+        The most queued actions which are allowed to run at the same time.
+        Changes apply to every action which has not started yet: raising the
+        limit starts waiting actions straight away, and lowering it holds
+        them back until enough of the running actions finish.
+        """
+        return self._max_concurrent_actions
+
+    @max_concurrent_actions.setter
+    def max_concurrent_actions(self, max_concurrent_actions: int) -> None:
+        self._max_concurrent_actions = max_concurrent_actions
+        self._start_waiting_actions()
+
+    def _order_focus(self, element: "TUIElement", previous: Optional[int]) -> None:
+        if not element.is_focusable:
+            element._focus_first = None
+            element._focus_last = None
+            element._focus_prev = None
+            return
+        element._focus_first = len(self._focus_order)
+        element._focus_prev = previous
+        focusable_children = element.focusable_children
+        if focusable_children is None or len(focusable_children) == 0:
+            self._focus_order.append(element)
+        else:
+            for child in focusable_children:
+                self._order_focus(child, previous)
+                previous = child._focus_first
+        element._focus_last = len(self._focus_order) - 1
+
+    def elements_at(self, x: int, y: int) -> List["TUIElement"]:
+        """Returns the elements subscribed to mouse events whose frames contain the screen cell"""
+        if self._event_routing_stale:
+            self._rebuild_event_routing()
+        return self._hit_index.at(x, y)
+
+    def _rebuild_event_routing(self) -> None:
+        self.events.clear()
+        self._hit_index.clear()
+        self._executors = []
+        self._routing_generation += 1
+        self._route_element(self.top_level_element)
+        self._event_routing_stale = False
+
+    def _route_element(self, element: "TUIElement") -> None:
+        element._routing_generation = self._routing_generation
+        element._hit_region = None
+        if element._legacy_execute:
+            self._executors.append(element)
+        if element._subscriptions is not None:
+            for event, handlers in element._subscriptions.items():
+                if event is EventType.MOUSE:
+                    # Mouse events are routed by position instead
+                    if element.draw_frame.is_drawable:
+                        element._hit_region = element.draw_frame.bounds
+                        self._hit_index.add(element._hit_region, element)
+                    continue
+                for handler in handlers:
+                    self.events.subscribe(event, handler)
+        if element.children is not None:
+            for child in element.children:
+                self._route_element(child)
 
     # TODO: Find the active element and focus next or prev
     async def update_navigation(navigation_input: NavigationInput) -> None:
         pass
 
     def _get_screen_size(self) -> None:
-        height, width = self.screen.getmaxyx()
-        self._screen_size = (width, height)
+        self._screen_size = self.backend.get_size()
 
     @property
     def screen_width(self) -> int:
@@ -223,6 +1007,14 @@ class DrawFrame:
         self.bounds = bounds
         self.offset = offset
 
+    def is_equivalent(self, other: "DrawFrame") -> bool:
+        """Whether drawing in `other` would put things in the same places"""
+        return (
+            self.window is other.window
+            and self.bounds == other.bounds
+            and self.offset == other.offset
+        )
+
     def draw(
         self,
         x: int,
@@ -286,6 +1078,74 @@ class DrawFrame:
             ScreenCoord(adjusted_x, adjusted_y), text, style, z
         )  # TODO: figure out if we want to make everything use screen cords.
 
+    def fill(
+        self,
+        x: int,
+        y: int,
+        width: int,
+        height: int,
+        character: str = " ",
+        style: int = None,
+        z: int = 0,
+    ) -> None:
+        """Fills `width` by `height` cells, starting at (x, y), with `character`"""
+        if not isinstance(character, str) or len(character) != 1:
+            raise ValueError(
+                f"`DrawFrame.fill` expected `character` to be a single character, received {repr(character)}."
+            )
+        if style is not None and not isinstance(style, int):
+            raise ValueError(
+                f"`DrawFrame.fill` expected `style` to be type `int` or value `None`, received type {type(style)}."
+            )
+
+        if not self.is_drawable:
+            return
+
+        left = x + self.bounds[0].x
+        top = y + self.bounds[0].y
+        if self.offset is not None:
+            left += self.offset[0]
+            top += self.offset[1]
+
+        right = min(left + width - 1, self.bounds[1].x, self.window.width)
+        bottom = min(
+            top + height - 1,
+            self.bounds[1].y,
+            self.window.height + self.window.bounds[0].y,
+        )
+        left = max(left, self.bounds[0].x)
+        top = max(top, self.bounds[0].y)
+        if left > right or top > bottom:
+            return
+
+        self.window.schedule_fill(
+            (ScreenCoord(left, top), ScreenCoord(right, bottom)), character, style, z
+        )
+
+    def border(self, style: int = None, z: int = 0) -> None:
+        """Draws a box with rounded corners around the edge of the frame"""
+        if not self.is_drawable:
+            return
+
+        width, height = self.width, self.height
+        self.fill(1, 0, width - 2, 1, "─", style, z)
+        self.fill(1, height - 1, width - 2, 1, "─", style, z)
+        self.fill(0, 1, 1, height - 2, "│", style, z)
+        self.fill(width - 1, 1, 1, height - 2, "│", style, z)
+        self.draw(0, 0, "╭", style, z=z)
+        self.draw(width - 1, 0, "╮", style, z=z)
+        self.draw(width - 1, height - 1, "╯", style, z=z)
+        self.draw(0, height - 1, "╰", style, z=z)
+
+    def divider(self, y: int, style: int = None, z: int = 0) -> None:
+        """Draws a line across row `y`, joined to the sides of a `border`"""
+        if not self.is_drawable:
+            return
+
+        self.fill(1, y, self.width - 2, 1, "─", style, z)
+        self.draw(0, y, "├", style, z=z)
+        self.draw(self.width - 1, y, "┤", style, z=z)
+
     def pad(self, horizontal: int, vertical: int) -> "DrawFrame":
         if (
             not self.is_drawable
@@ -506,6 +1366,152 @@ class DrawFrame:
         return f"DrawFrame(screen={self.screen}, bounds={self.bounds})"
 
 
+class Completed:
+    """
+    An awaitable which is already done. The synchronous `frame` and `draw`
+    methods return it, so that elements written back when those were
+    coroutines can still `await` them.
+    """
+
+    __slots__ = ()
+
+    def __await__(self):
+        return
+        yield
+
+
+COMPLETED = Completed()
+
+
+def run_synchronously(
+    method: Callable[..., Awaitable[Any]],
+) -> Callable[..., Any]:
+    """
+    Wraps a `frame` or `draw` implementation which is a coroutine function,
+    so that it runs to completion when called. Such implementations only
+    await the `frame` and `draw` of other elements, which are already done,
+    so they never need to be suspended.
+    """
+
+    @functools.wraps(method)
+    def synchronous_method(*args: Any, **kwargs: Any) -> Any:
+        coroutine = method(*args, **kwargs)
+        try:
+            coroutine.send(None)
+        except StopIteration as stop:
+            return stop.value
+        coroutine.close()
+        raise RuntimeError(
+            f"`{method.__qualname__}` awaited something which was not done. `frame` and `draw` can not wait for anything, use `queue_action` instead."
+        )
+
+    return synchronous_method
+
+
+def cache_draw_calls(
+    draw: Callable[["TUIElement"], None],
+) -> Callable[["TUIElement"], Completed]:
+    """
+    Wraps a `TUIElement.draw` implementation so that the draw calls it makes
+    are recorded on the element (See `TUIWindow.record_draw_calls`). Until
+    the element is invalidated, the window replays the recording instead of
+    running the drawing logic again.
+
+    Children drawn from inside of `draw` are recorded as references rather
+    than as their draw calls, so that each child keeps its own recording and
+    a clean parent can still redraw a child which has changed.
+    """
+
+    @functools.wraps(draw)
+    def cached_draw(self: "TUIElement") -> Completed:
+        window = self.draw_frame.window
+        # Calls through `super().draw()` belong to the recording in progress
+        if window is None or window._drawing_element is self:
+            draw(self)
+            return COMPLETED
+
+        if window._draw_recording is not None:
+            window._draw_recording.append(self)
+            if self._needs_paint:
+                window.record_draw_calls(self)
+        else:
+            if self._needs_paint:
+                window.record_draw_calls(self)
+            window.replay_draw_calls(self)
+        return COMPLETED
+
+    return cached_draw
+
+
+def cache_size(
+    get_size: Callable[["TUIElement", int | None, int | None], Tuple[int, int]],
+) -> Callable[["TUIElement", int | None, int | None], Tuple[int, int]]:
+    """
+    Wraps a `TUIElement.get_size` implementation so that its results are
+    remembered for each pair of constraints. The results are forgotten when
+    the element, or one of its descendants, is invalidated with
+    `Invalidation.LAYOUT`, so sizes may only depend on layout attributes and
+    on the sizes of children.
+
+    Only the outermost call is cached, since overrides calling through
+    `super().get_size()` may pass different constraints to the parent class.
+    """
+
+    @functools.wraps(get_size)
+    def cached_get_size(
+        self: "TUIElement",
+        width_constraint: int | None = None,
+        height_constraint: int | None = None,
+    ) -> Tuple[int, int]:
+        # Calls through `super().get_size()` belong to the size being computed
+        if self._sizing:
+            return get_size(self, width_constraint, height_constraint)
+
+        key = (width_constraint, height_constraint)
+        if self._size_cache is not None:
+            size = self._size_cache.get(key)
+            if size is not None:
+                return size
+
+        self._sizing = True
+        try:
+            size = get_size(self, width_constraint, height_constraint)
+        finally:
+            self._sizing = False
+        if self._size_cache is None:
+            self._size_cache = {}
+        elif len(self._size_cache) >= self.MAX_CACHED_SIZES:
+            self._size_cache.clear()
+        self._size_cache[key] = size
+        return size
+
+    return cached_get_size
+
+
+def skip_unchanged_frames(
+    frame: Callable[["TUIElement", DrawFrame], None],
+) -> Callable[["TUIElement", DrawFrame], Completed]:
+    """
+    Wraps a `TUIElement.frame` implementation so that being given a frame
+    equivalent to the current one does nothing, unless the element has been
+    invalidated with `Invalidation.LAYOUT`. Descendants which need layout
+    are still reframed by the window when it updates the dirty elements.
+    """
+
+    @functools.wraps(frame)
+    def skipping_frame(self: "TUIElement", draw_frame: DrawFrame) -> Completed:
+        if (
+            not self._needs_layout
+            and draw_frame is not self.draw_frame
+            and draw_frame.is_equivalent(self.draw_frame)
+        ):
+            return COMPLETED
+        frame(self, draw_frame)
+        return COMPLETED
+
+    return skipping_frame
+
+
 class TUIElement:
     IS_INTERACTABLE: bool = (
         False  # TODO: maybe interactability can be done by checking the update and navigation update functions
@@ -513,33 +1519,181 @@ class TUIElement:
 
     draw_frame: DrawFrame
     window: TUIWindow
-    children: Optional[List["TUIElement"]] = None
     parent: Optional["TUIElement"] = None
-
-    _is_focusable = None
-    _focusable_children = None
+    # The children in order, as the keys of a dict, so that checking for and
+    # removing a child does not search through them. `children` lists the same
+    # elements, and is rebuilt from this after a child is removed
+    _child_order: Optional[Dict["TUIElement", None]] = None
+    _children: Optional[List["TUIElement"]] = None
+
+    # Attributes which, when changed, require the element to be reframed or
+    # redrawn. Public attributes which are not declared anywhere are assumed
+    # to affect painting, and private attributes are assumed to affect
+    # neither. Declarations are inherited, and can be overriden by subclasses.
+    LAYOUT_ATTRIBUTES: Set[str] = set()
+    PAINT_ATTRIBUTES: Set[str] = set()
+    INERT_ATTRIBUTES: Set[str] = {"parent", "children", "window"}
+
+    _attribute_invalidations: Dict[str, Invalidation] = {}
+    _legacy_update: bool = False
+    # Kept up to date by `focus`, so that checking them is cheap while drawing
+    _focused: bool = False
+    _active: bool = False
+    _focused_child: Optional["TUIElement"] = None
+    # The span of this subtree in the window's focus order, and where
+    # focus_prev goes from here
+    _focus_first: Optional[int] = None
+    _focus_last: Optional[int] = None
+    _focus_prev: Optional[int] = None
+    _legacy_execute: bool = False
+    _subscriptions: Optional[Dict[Hashable, List[Callable[..., Awaitable[None]]]]] = (
+        None
+    )
+    # The window routing generation the element was last routed in, and the
+    # region it was put in the hit index with (See `TUIWindow.reindex_element`)
+    _routing_generation: Optional[int] = None
+    _hit_region: Optional[Tuple[ScreenCoord, ScreenCoord]] = None
+
+    _is_focusable: bool = False
+    # How many children are focusable, kept up to date as their focusability
+    # changes, so that it never needs to be recomputed from the whole subtree
+    _focusable_child_count: int = 0
+    _focusable_children: Optional[List["TUIElement"]] = None
+    # The draw calls made by `draw`, which are (DrawOp, region, text or fill
+    # character, style, z) tuples or the children drawn, in order
+    _draw_calls: Optional[List["Tuple | TUIElement"]] = None
+    # The draw calls of the element and the children it draws, flattened (See
+    # `TUIWindow.compile_display_list`)
+    _display_list: Optional[List[Tuple]] = None
+    _subtree_extent: Optional[Tuple[ScreenCoord, ScreenCoord]] = None
+    # The draw calls by position, for elements which make a lot of them (See
+    # `TUIWindow.index_draw_calls`), and the position of this element in the
+    # draw calls of its parent, if the parent draws it
+    _draw_index: Optional[HitIndex] = None
+    _draw_position: Optional[int] = None
+    _needs_layout: bool = False
+    _needs_paint: bool = True
+    # The children which are dirty, or have dirty descendants, in the order
+    # they were invalidated
+    _dirty_children: Optional[Dict["TUIElement", None]] = None
+    # Results of `get_size` by constraints (See `cache_size`)
+    _size_cache: Optional[Dict[Tuple[int | None, int | None], Tuple[int, int]]] = None
+    MAX_CACHED_SIZES: int = 32
+    # Set while the element's `get_size` is running (See `cache_size`)
+    _sizing: bool = False
 
     def __init__(self) -> None:
         self.draw_frame = DrawFrame(None)
         self.window = None
+        if self._legacy_update:
+            self.subscribe(EventType.KEY, self._run_legacy_update)
+            self.subscribe(EventType.MOUSE, self._run_legacy_update)
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # Layout and painting are synchronous, but elements which still
+        # implement them as coroutines keep working
+        for name in ["frame", "draw"]:
+            if inspect.iscoroutinefunction(cls.__dict__.get(name)):
+                setattr(cls, name, run_synchronously(cls.__dict__[name]))
+        if "draw" in cls.__dict__:
+            cls.draw = cache_draw_calls(cls.draw)
+        if "get_size" in cls.__dict__:
+            cls.get_size = cache_size(cls.get_size)
+        if "frame" in cls.__dict__:
+            cls.frame = skip_unchanged_frames(cls.frame)
+        # Elements which handle their input in `update` are subscribed to
+        # every key and mouse event, in the same way they used to receive them
+        if "update" in cls.__dict__:
+            cls._legacy_update = True
+        # Likewise, elements which override `execute` have it called after
+        # every input event, rather than queueing their actions
+        if "execute" in cls.__dict__:
+            cls._legacy_execute = True
+
+        attribute_invalidations = {}
+        for klass in reversed(cls.__mro__):
+            for invalidation, attributes in [
+                (Invalidation.NONE, klass.__dict__.get("INERT_ATTRIBUTES", ())),
+                (Invalidation.PAINT, klass.__dict__.get("PAINT_ATTRIBUTES", ())),
+                (Invalidation.LAYOUT, klass.__dict__.get("LAYOUT_ATTRIBUTES", ())),
+            ]:
+                for attribute in attributes:
+                    attribute_invalidations[attribute] = invalidation
+        cls._attribute_invalidations = attribute_invalidations
+
+    @classmethod
+    def attribute_invalidation(cls, name: str) -> Invalidation:
+        """Returns what needs to be redone when the attribute `name` changes"""
+        invalidation = cls._attribute_invalidations.get(name)
+        if invalidation is not None:
+            return invalidation
+        if name.startswith("_"):
+            return Invalidation.NONE
+        return Invalidation.PAINT
 
     # What things invalidate the drawn state?
     # - Focusing an element
     # - Internal logic in update
     # - Reframing
+    # Each of these calls `invalidate`, which marks the element as dirty so
+    # that the window reframes or redraws it on the next draw
+
+    def invalidate(self, invalidation: Invalidation = Invalidation.PAINT) -> None:
+        """Marks the element, and the path to it from the top of the tree, as dirty"""
+        if invalidation is Invalidation.NONE:
+            return
+        if invalidation is Invalidation.LAYOUT:
+            self._needs_layout = True
+            if self.draw_frame.window is not None:
+                self.draw_frame.window.invalidate_layouts()
+            # The sizes of everything above may depend on the size of this
+            element = self
+            while element is not None:
+                element._size_cache = None
+                element = element.parent
+        self._needs_paint = True
+        if self.draw_frame.window is not None:
+            self.draw_frame.window.request_redraw()
+
+        element = self
+        parent = self.parent
+        while parent is not None:
+            if parent._dirty_children is not None:
+                # The path above is already marked
+                parent._dirty_children[element] = None
+                break
+            parent._dirty_children = {element: None}
+            element = parent
+            parent = parent.parent
 
-    # TODO: frame and draw probably don't need to be async
+    @property
+    def is_dirty(self) -> bool:
+        return (
+            self._needs_layout or self._needs_paint or self._dirty_children is not None
+        )
 
     def get_size(
         self, width_constraint: int | None = None, height_constraint: int | None = None
     ) -> Tuple[int, int]:
         raise NotImplementedError("")  # TODO: write this error
 
-    async def frame(self, draw_frame: DrawFrame) -> None:
+    @skip_unchanged_frames
+    def frame(self, draw_frame: DrawFrame) -> None:
         """Sets the location for the object to be drawn in the view"""
         self.draw_frame = draw_frame
         self.window = draw_frame.window  # TODO: is this necessary?
 
+    def _layout_state(self) -> Any:
+        """
+        Returns whatever `frame` computed for the element, other than its
+        draw frame, so that the layout can be restored without reframing
+        """
+        return None
+
+    def _restore_layout_state(self, state: Any) -> None:
+        pass
+
     async def navigation_update(self, navigation_input: NavigationInput) -> None:
         """Is called on the active element when navigation input is received."""
         if navigation_input is NavigationInput.NONE:
@@ -551,62 +1705,172 @@ class TUIElement:
     async def update(
         self, event_code: int, mouse_x: int, mouse_y: int, mouse_button: int
     ) -> None:
-        """Updates the object based on the user input. Prefer to use navigation_update."""
+        """
+        Updates the object based on the user input. Prefer to use
+        navigation_update, or to subscribe to the events the element needs.
+        """
         pass
 
+    async def _run_legacy_update(self, event: InputEvent) -> None:
+        await self.update(event.key, event.mouse_x, event.mouse_y, event.mouse_button)
+
+    def subscribe(
+        self, event: Hashable, handler: Callable[..., Awaitable[None]]
+    ) -> None:
+        """
+        Has the window call `handler` whenever `event` happens. The event can be
+        a key code, `EventType.KEY` for every key, `EventType.MOUSE` for mouse
+        events inside of the frame of the element, `EventType.RESIZE`, or any
+        other value for custom events (See `TUIWindow.dispatch_event`). Input
+        events are passed to the handler as an `InputEvent`.
+        """
+        if self._subscriptions is None:
+            self._subscriptions = {}
+        self._subscriptions.setdefault(event, []).append(handler)
+        if self.draw_frame.window is not None:
+            self.draw_frame.window.route_subscription(self, event, handler)
+
+    def unsubscribe(
+        self, event: Hashable, handler: Callable[..., Awaitable[None]]
+    ) -> None:
+        if self._subscriptions is None or not event in self._subscriptions:
+            return
+        try:
+            self._subscriptions[event].remove(handler)
+        except ValueError:
+            pass
+        if len(self._subscriptions[event]) == 0:
+            del self._subscriptions[event]
+        if self.draw_frame.window is not None:
+            self.draw_frame.window.unroute_subscription(self, event, handler)
+
+    async def dispatch_mouse_event(self, event: InputEvent) -> None:
+        if self._subscriptions is None:
+            return
+        for handler in self._subscriptions.get(EventType.MOUSE, []).copy():
+            await handler(event)
+
+    def _invalidate_event_routing(self) -> None:
+        # Only changes to the element tree need everything routed again
+        if self.draw_frame.window is not None:
+            self.draw_frame.window.invalidate_event_routing()
+            self.draw_frame.window.invalidate_focus_order()
+
     async def execute(self) -> None:
-        """Execute any actions that the object needs to perform"""
+        """
+        Execute any actions that the object needs to perform. Prefer to use
+        queue_action, so that the element is not called when it has nothing
+        to do.
+        """
         pass
 
-    async def draw(self) -> None:
+    def queue_action(self, action: Callable[[], Awaitable[None]]) -> asyncio.Task:
+        """Has the window run `action` (See `TUIWindow.queue_action`)"""
+        return self.draw_frame.window.queue_action(action)
+
+    def draw(self) -> None:
         """Draw the object to the screen"""
         raise NotImplementedError("`TUIElement`s must implement a draw method")
 
+    @property
+    def children(self) -> Optional[List["TUIElement"]]:
+        if self._children is None and self._child_order is not None:
+            self._children = list(self._child_order)
+        return self._children
+
     # TODO: change this to be automatic, so that implementers of TUIElement do
     # not need to remember to do it. (Use the attribute assignment to check if we are adding
     # a TUIElement as an attribute.)
     # Wait... maybe not, the TUIElement in question could be a parent...
     def add_child(self, child: "TUIElement") -> None:
-        if self.children is None:
-            self.children = []
-
-        if child in self.children:
-            raise ValueError(
-                f"`TUIElement` received a child which is already a child of this object."
-            )
-
-        self.children.append(child)
-        child.parent = self
+        self.add_children([child])
+
+    def add_children(self, children: Iterable["TUIElement"]) -> None:
+        """Adds each of `children` after the existing children, in order"""
+        if self._child_order is None:
+            self._child_order = {}
+            self._children = []
+
+        children = list(children)
+        for index, child in enumerate(children):
+            if child in self._child_order:
+                for added_child in children[:index]:
+                    del self._child_order[added_child]
+                raise ValueError(
+                    f"`TUIElement` received a child which is already a child of this object."
+                )
+            self._child_order[child] = None
+        if len(children) == 0:
+            return
 
-        if child.is_focusable:
-            self._is_focusable = True
+        if self._children is not None:
+            self._children.extend(children)
+        focusable_children_added = 0
+        for child in children:
+            child.parent = self
+            if child.is_focusable:
+                focusable_children_added += 1
+        self.invalidate(Invalidation.LAYOUT)
+        self._invalidate_event_routing()
+
+        if focusable_children_added > 0:
+            self._focusable_child_changed(focusable_children_added)
+
+    def set_children(self, children: Iterable["TUIElement"]) -> None:
+        """Replaces all of the children of this element with `children`"""
+        if self._child_order is not None:
+            for child in self._child_order:
+                child.parent = None
+            self._child_order = None
+            self._children = None
+            self.invalidate(Invalidation.LAYOUT)
+            self._invalidate_event_routing()
+            if self._focusable_child_count > 0:
+                self._focusable_child_changed(-self._focusable_child_count)
+        self.add_children(children)
 
     def remove_child(self, child: "TUIElement") -> None:
-        try:
-            self.children.remove(child)
-            self._is_focusable = None
-        except ValueError:
-            pass
+        """
+        Removes `child` in constant time. The `children` list is rebuilt the
+        next time it is read, so removing many children only pays for that
+        once.
+        """
+        if self._child_order is not None and child in self._child_order:
+            del self._child_order[child]
+            self._children = None
+            self.invalidate(Invalidation.LAYOUT)
+            self._invalidate_event_routing()
+            if child.is_focusable:
+                self._focusable_child_changed(-1)
 
         child.parent = None
 
-        if len(self.children) == 0:
-            self.children = None
+        if self._child_order is not None and len(self._child_order) == 0:
+            self._child_order = None
+            self._children = None
 
     @property
     def is_focusable(self) -> bool:
-        if self._is_focusable is None:
-            if self.IS_INTERACTABLE and self.draw_frame.is_drawable:
-                self._is_focusable = True
-                return True
-            if self.children is not None:
-                for child in self.children:
-                    if child.is_focusable:
-                        self._is_focusable = True
-                        return True
-            self._is_focusable = False
         return self._is_focusable
 
+    def _update_focusability(self) -> None:
+        is_focusable = self.draw_frame.is_drawable and (
+            self.IS_INTERACTABLE or self._focusable_child_count > 0
+        )
+        if is_focusable == self._is_focusable:
+            return
+        self._is_focusable = is_focusable
+
+        if self.draw_frame.window is not None:
+            self.draw_frame.window.invalidate_focus_order()
+        if self.parent is not None:
+            self.parent._focusable_child_changed(1 if is_focusable else -1)
+
+    def _focusable_child_changed(self, delta: int) -> None:
+        self._focusable_child_count += delta
+        self._focusable_children = None
+        self._update_focusability()
+
     @property
     def focusable_children(self) -> List["TUIElement"]:
         if self.children is None:
@@ -620,113 +1884,138 @@ class TUIElement:
 
     # TODO: why is this not a property if other things are?
     def is_focused(self) -> bool:
-        if self.window is None:
-            return False
-        return (
-            self in self.window._focused_elements
-        )  # TODO: avoid accessing the private members of TUIWindow
+        return self._focused
 
     def is_active(self) -> bool:
-        if self.window is None:
-            return False
-        return self is self.window._active_element
+        return self._active
 
     def focus_next(self) -> None:
-        if self.is_focusable and self.children is not None:
-            # Find the currently focused child
-            currently_focused_child_index = -1
-            for index, child in enumerate(self.children):
-                if child.is_focused():
-                    currently_focused_child_index = index
-                    break
+        """
+        Focuses the first element of the focusable child after the currently
+        focused one. If there is none, moves on to the children after this
+        element in its parent instead.
+        """
+        window = self.draw_frame.window
+        if window is None:
+            return
+        focus_order = window.focus_order
 
-            # Find the next focusable child
-            next_focusable_child = None
-            for child_index in range(
-                currently_focused_child_index + 1, len(self.children)
-            ):
-                child = self.children[child_index]
-                if child.is_focusable:
-                    next_focusable_child = child
-                    break
+        if not self.is_focusable or len(self.focusable_children or []) == 0:
+            if self.parent is not None:
+                self.parent.focus_next()
+            return
 
-            if next_focusable_child is None:
-                if not self.parent is None:
-                    self.parent.focus_next()
-            else:
-                child.focus()
-        elif self.parent is not None:
-            self.parent.focus_next()
+        if not self._focused or self._focused_child is None:
+            focus_order[self._focus_first]._take_focus()
+            return
+
+        # Running out of children continues in the parent, which always ends
+        # up right after the focused child in the focus order
+        index = self._focused_child._focus_last + 1
+        if index < len(focus_order):
+            focus_order[index]._take_focus()
 
     def focus_prev(self) -> None:
-        if self.is_focusable and self.children is not None:
-            # Find the currently focused child
-            currently_focused_child_index = len(self.children)
-            for index, child in enumerate(self.children):
-                if child.is_focused():
-                    currently_focused_child_index = index
-                    break
+        """
+        Focuses the first element of the focusable child before the currently
+        focused one. If there is none, moves on to the children before this
+        element in its parent instead.
+        """
+        window = self.draw_frame.window
+        if window is None:
+            return
+        focus_order = window.focus_order
 
-            # Find the next focusable child
-            next_focusable_child = None
-            for child_index in range(currently_focused_child_index - 1, -1, -1):
-                child = self.children[child_index]
-                if child.is_focusable:
-                    next_focusable_child = child
-                    break
+        if not self.is_focusable or len(self.focusable_children or []) == 0:
+            if self.parent is not None:
+                self.parent.focus_prev()
+            return
 
-            if next_focusable_child is None:
-                if not self.parent is None:
-                    self.parent.focus_prev()
-            else:
-                child.focus()
-        elif self.parent is not None:
-            self.parent.focus_prev()
+        if not self._focused or self._focused_child is None:
+            index = self.focusable_children[-1]._focus_first
+        else:
+            index = self._focused_child._focus_prev
+        if index is not None:
+            focus_order[index]._take_focus()
 
-    def focus(self) -> None:
-        if self.window is None:
+    def focus(self, last: bool = False) -> None:
+        window = self.draw_frame.window
+        if window is None:
             return
+        focus_order = window.focus_order
 
-        # TODO: fix this so that Window is in charge of its private members
         if not self.is_focusable:
             if self.parent is not None:
                 self.parent.focus_next()
+            return
+        if self._focus_first is None:
+            return  # Not attached to the window's element tree
 
-        if self.children is not None and len(self.children) > 0:
-            for child in self.children:
-                if child.is_focusable:
-                    return child.focus()
-
-        self.window._focused_elements.clear()
-        parent = self.parent
-        while parent is not None:
-            if parent in self.window._focused_elements:
-                break
-            self.window._focused_elements.append(parent)
-            parent = parent.parent
+        if last:
+            focus_order[self._focus_last]._take_focus()
+        else:
+            focus_order[self._focus_first]._take_focus()
 
-        self.window._active_element = self
-        self.window._focused_elements.append(self)
+    def _take_focus(self) -> None:
+        # TODO: fix this so that Window is in charge of its private members
+        window = self.draw_frame.window
+        previously_active_element = window._active_element
+
+        focused_elements = []
+        element = self
+        while element is not None:
+            focused_elements.append(element)
+            element = element.parent
+        newly_focused_elements = [
+            element for element in focused_elements if not element._focused
+        ]
+
+        for element in window._focused_elements:
+            element._focused = False
+            element._focused_child = None
+        for index, element in enumerate(focused_elements):
+            element._focused = True
+            if index > 0:
+                element._focused_child = focused_elements[index - 1]
+
+        # Anything whose focus state changed needs to be drawn again
+        for element in window._focused_elements:
+            if not element._focused:
+                element.invalidate()
+        for element in newly_focused_elements:
+            element.invalidate()
+        window._focused_elements = focused_elements
+
+        if previously_active_element is not self:
+            if previously_active_element is not None:
+                previously_active_element._active = False
+                previously_active_element.invalidate()
+            self._active = True
+            window._active_element = self
+            self.invalidate()
 
     def __setattr__(self, name: str, value: Any) -> None:
         # TODO: this is kind of janky. Seems like there should be a nicer way...
-        if (
-            not name == "draw_frame"
-            and self.draw_frame.window is not None
-            and not getattr(self, name) == value
-        ):
-            self.draw_frame.window._needs_redraw = True
+        if not name == "draw_frame":
+            invalidation = self.attribute_invalidation(name)
+            # Sizes can be measured before the element is in a window
+            changed = (
+                not invalidation is Invalidation.NONE
+                and (self.draw_frame.window is not None or self._size_cache is not None)
+                and not getattr(self, name, None) == value
+            )
+            super().__setattr__(name, value)
+            if changed:
+                self.invalidate(invalidation)
+            return
+
         super().__setattr__(name, value)
-        if name == "draw_frame":
-            if not self.draw_frame.is_drawable:
-                self._is_focusable = False
-                self._focusable_children = []
-            else:
-                self._is_focusable = None
-                self._focusable_children = None
-
-            parent = self.parent
-            while parent is not None:
-                parent._is_focusable = None
-                parent._focusable_children = None
-                parent = parent.parent
+        # Being given a frame is the result of laying the element out
+        self._needs_layout = False
+        self.invalidate()
+        if value.window is not None:
+            value.window.reindex_element(self)
+
+        # Only changes in focusability are passed on to the parent, so
+        # reframing everything does not walk up the tree for each element
+        self._update_focusability()
@@ -8,6 +8,23 @@ class Orientation(Enum):
     VERTICAL = "vertical"
 
 
+class Invalidation(Enum):
+    LAYOUT = "layout"
+    PAINT = "paint"
+    NONE = "none"
+
+
+class EventType(Enum):
+    KEY = "key"
+    MOUSE = "mouse"
+    RESIZE = "resize"
+
+
+class DrawOp(Enum):
+    TEXT = "text"  # A run of text on one line
+    FILL = "fill"  # A region filled with one character
+
+
 class NavigationInput(Enum):
     UP = "up"
     DOWN = "down"
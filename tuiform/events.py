@@ -0,0 +1,122 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+import curses
+
+from tuiform.backend import Backend
+
+
+class InputEvent:
+    """A key read from a `Backend`, along with the mouse state for `curses.KEY_MOUSE`"""
+
+    __slots__ = ["key", "mouse_x", "mouse_y", "mouse_button"]
+
+    key: int
+    mouse_x: int
+    mouse_y: int
+    mouse_button: int
+
+    def __init__(
+        self,
+        key: int,
+        mouse_x: int = None,
+        mouse_y: int = None,
+        mouse_button: int = None,
+    ) -> None:
+        self.key = key
+        self.mouse_x = mouse_x
+        self.mouse_y = mouse_y
+        self.mouse_button = mouse_button
+
+    @property
+    def is_mouse_motion(self) -> bool:
+        return (
+            self.key == curses.KEY_MOUSE
+            and self.mouse_button & curses.REPORT_MOUSE_POSITION != 0
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"InputEvent(key={self.key}, mouse_x={self.mouse_x}, "
+            f"mouse_y={self.mouse_y}, mouse_button={self.mouse_button})"
+        )
+
+
+class EventBus:
+    """
+    Keeps the handlers subscribed to each event, so that dispatching an event
+    only costs as much as the number of handlers interested in it.
+    """
+
+    __slots__ = ["_handlers"]
+
+    _handlers: Dict[Hashable, List[Callable[..., Awaitable[None]]]]
+
+    def __init__(self) -> None:
+        self._handlers = {}
+
+    def subscribe(
+        self, event: Hashable, handler: Callable[..., Awaitable[None]]
+    ) -> None:
+        self._handlers.setdefault(event, []).append(handler)
+
+    def unsubscribe(
+        self, event: Hashable, handler: Callable[..., Awaitable[None]]
+    ) -> None:
+        handlers = self._handlers.get(event)
+        if handlers is None:
+            return
+        try:
+            handlers.remove(handler)
+        except ValueError:
+            pass
+        if len(handlers) == 0:
+            del self._handlers[event]
+
+    async def dispatch(self, event: Hashable, *args: Any) -> None:
+        handlers = self._handlers.get(event)
+        if handlers is None:
+            return
+        # Handlers may subscribe or unsubscribe while we are dispatching
+        for handler in handlers.copy():
+            await handler(*args)
+
+    def clear(self) -> None:
+        self._handlers = {}
+
+    def __repr__(self) -> str:
+        return f"EventBus(events={list(self._handlers)})"
+
+
+def read_events(backend: Backend) -> List[InputEvent]:
+    """
+    Reads every pending key from `backend`. Runs of mouse motion are collapsed
+    into the latest position, and runs of resizes into a single resize, since
+    only the last one of either matters by the time we get to handle them.
+    """
+    events: List[InputEvent] = []
+    while True:
+        key = backend.get_key()
+        if key == curses.ERR:
+            return events
+
+        if key == curses.KEY_MOUSE:
+            event = InputEvent(key, *backend.get_mouse())
+        else:
+            event = InputEvent(key)
+
+        if len(events) > 0 and (
+            (event.is_mouse_motion and events[-1].is_mouse_motion)
+            or (key == curses.KEY_RESIZE and events[-1].key == curses.KEY_RESIZE)
+        ):
+            events[-1] = event
+        else:
+            events.append(event)
+
+
+async def await_events(backend: Backend) -> List[InputEvent]:
+    """Waits for input, then returns every pending event (See `read_events`)"""
+    while True:
+        events = read_events(backend)
+        if len(events) > 0:
+            return events
+        await backend.wait_for_input()
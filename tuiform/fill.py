@@ -3,6 +3,8 @@ from tuiform.element import TUIElement
 
 
 class Fill(TUIElement):
+    PAINT_ATTRIBUTES = {"fill_char", "style"}
+
     fill_char: str
     style: int
 
@@ -22,7 +24,18 @@ class Fill(TUIElement):
 
         return min(1, width_constraint), min(1, height_constraint)
 
-    async def draw(self) -> None:
+    def draw(self) -> None:
+        if len(self.fill_char) == 1:
+            self.draw_frame.fill(
+                0,
+                0,
+                self.draw_frame.width,
+                self.draw_frame.height,
+                self.fill_char,
+                self.style,
+            )
+            return
+
         for y in range(self.draw_frame.height):
             self.draw_frame.draw(
                 0, y, self.fill_char * self.draw_frame.width, self.style
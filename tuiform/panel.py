@@ -5,11 +5,23 @@ import curses
 from tuiform.enums import NavigationInput
 from tuiform.screen import ScreenCoord
 from tuiform.element import TUIElement, DrawFrame
+from tuiform.style import color_pair
 
 
 # TODO: Footer and header separators dissapear when panel is 4 wide
 # TODO: allow panel footer and header height to be set by the footer and header elements, optionally
 class Panel(TUIElement):
+    LAYOUT_ATTRIBUTES = {
+        "content",
+        "header",
+        "footer",
+        "vertical_padding",
+        "horizontal_padding",
+        "header_height",
+        "footer_height",
+    }
+    INERT_ATTRIBUTES = {"active"}
+
     content: TUIElement
     header: Optional[TUIElement]
     footer: Optional[TUIElement]
@@ -81,7 +93,7 @@ class Panel(TUIElement):
 
         return width, height
 
-    async def frame(self, draw_frame: DrawFrame) -> None:
+    def frame(self, draw_frame: DrawFrame) -> None:
         self.draw_frame = draw_frame
         inner_frame = self.draw_frame.pad(1, 1)
         content_top = 0
@@ -102,7 +114,7 @@ class Panel(TUIElement):
             header_frame = header_frame.pad(
                 self.horizontal_padding, self.vertical_padding
             )
-            await self.header.frame(header_frame)
+            self.header.frame(header_frame)
             if header_frame.is_drawable:
                 content_top = header_bottom + 2 + 2 * self.vertical_padding
 
@@ -122,7 +134,7 @@ class Panel(TUIElement):
             footer_frame = footer_frame.pad(
                 self.horizontal_padding, self.vertical_padding
             )
-            await self.footer.frame(footer_frame)
+            self.footer.frame(footer_frame)
             if footer_frame.is_drawable:
                 content_bottom = footer_top - (2 + 2 * self.vertical_padding)
 
@@ -136,7 +148,7 @@ class Panel(TUIElement):
         content_frame = content_frame.pad(
             self.horizontal_padding, self.vertical_padding
         )
-        await self.content.frame(content_frame)
+        self.content.frame(content_frame)
 
     async def navigation_update(self, navigation_input: NavigationInput) -> None:
         if navigation_input is NavigationInput.NONE:
@@ -181,77 +193,33 @@ class Panel(TUIElement):
         if self.parent is not None:
             await self.parent.navigation_update(navigation_input)
 
-    async def draw(self) -> None:
+    def draw(self) -> None:
         if not self.draw_frame.is_drawable:
             return
 
         if self.is_focused():
-            style = curses.color_pair(0)
+            style = color_pair(0)
         else:
-            style = curses.color_pair(0) | curses.A_DIM
-
-        for y in [0, self.draw_frame.height - 1]:
-            border = "─" * (self.draw_frame.width - 2)
-            self.draw_frame.draw(1, y, border, style)
+            style = color_pair(0) | curses.A_DIM
 
-        for x in [0, self.draw_frame.width - 1]:
-            for y in range(1, self.draw_frame.height - 1):
-                self.draw_frame.draw(x, y, "│", style)
-
-        self.draw_frame.draw(0, 0, "╭", style)
-        self.draw_frame.draw(self.draw_frame.width - 1, 0, "╮", style)
-        self.draw_frame.draw(
-            self.draw_frame.width - 1, self.draw_frame.height - 1, "╯", style
-        )
-        self.draw_frame.draw(0, self.draw_frame.height - 1, "╰", style)
+        self.draw_frame.border(style)
 
         if self.header is not None:
             if self.header.draw_frame.is_drawable:
-                separator = "─" * (self.draw_frame.width - 2)
-                header_separator_height = 1 + self.header_height
-                self.draw_frame.draw(1, header_separator_height, separator, style)
-                self.draw_frame.draw(0, header_separator_height, "├", style)
-                self.draw_frame.draw(
-                    self.draw_frame.width - 1, header_separator_height, "┤", style
-                )
+                self.draw_frame.divider(1 + self.header_height, style)
 
-            await self.header.draw()
+            self.header.draw()
 
         if self.footer is not None:
             if self.footer.draw_frame.is_drawable:
-                separator = "─" * (self.draw_frame.width - 2)
                 footer_separator_height = self.draw_frame.height - (
                     2 + self.footer_height + 2 * self.vertical_padding
                 )
-                self.draw_frame.draw(1, footer_separator_height, separator, style)
-                self.draw_frame.draw(0, footer_separator_height, "├", style)
-                self.draw_frame.draw(
-                    self.draw_frame.width - 1, footer_separator_height, "┤", style
-                )
-
-            await self.footer.draw()
-
-        await self.content.draw()
+                self.draw_frame.divider(footer_separator_height, style)
 
-    async def update(
-        self, event_code: int, mouse_x: int, mouse_y: int, mouse_button: int
-    ) -> None:
-        if self.header is not None:
-            await self.header.update(event_code, mouse_x, mouse_y, mouse_button)
-
-        if self.footer is not None:
-            await self.footer.update(event_code, mouse_x, mouse_y, mouse_button)
-
-        await self.content.update(event_code, mouse_x, mouse_y, mouse_button)
-
-    async def execute(self) -> None:
-        if self.header is not None:
-            await self.header.execute()
-
-        if self.footer is not None:
-            await self.footer.execute()
+            self.footer.draw()
 
-        await self.content.execute()
+        self.content.draw()
 
     def __repr__(self) -> str:
         return f"Panel(content={self.content}, header={self.header}, footer={self.footer}, horizontal_padding={self.horizontal_padding}, vertical_padding={self.vertical_padding})"
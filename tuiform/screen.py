@@ -1,3 +1,8 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from array import array
+
+
 class ScreenCoord:
     __slots__ = ["x", "y"]
 
@@ -8,5 +13,374 @@ class ScreenCoord:
         self.x = x
         self.y = y
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ScreenCoord):
+            return NotImplemented
+        return self.x == other.x and self.y == other.y
+
+    def __hash__(self) -> int:
+        return hash((self.x, self.y))
+
     def __repr__(self) -> str:
         return f"ScreenCoord(x={self.x}, y={self.y})"
+
+
+def regions_intersect(
+    a: Tuple[ScreenCoord, ScreenCoord], b: Tuple[ScreenCoord, ScreenCoord]
+) -> bool:
+    return (
+        a[0].x <= b[1].x and b[0].x <= a[1].x and a[0].y <= b[1].y and b[0].y <= a[1].y
+    )
+
+
+def region_contains(
+    outer: Tuple[ScreenCoord, ScreenCoord], inner: Tuple[ScreenCoord, ScreenCoord]
+) -> bool:
+    return (
+        outer[0].x <= inner[0].x
+        and inner[1].x <= outer[1].x
+        and outer[0].y <= inner[0].y
+        and inner[1].y <= outer[1].y
+    )
+
+
+def union_region(
+    a: Optional[Tuple[ScreenCoord, ScreenCoord]],
+    b: Optional[Tuple[ScreenCoord, ScreenCoord]],
+) -> Optional[Tuple[ScreenCoord, ScreenCoord]]:
+    """Returns the smallest region containing both `a` and `b`"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (
+        ScreenCoord(min(a[0].x, b[0].x), min(a[0].y, b[0].y)),
+        ScreenCoord(max(a[1].x, b[1].x), max(a[1].y, b[1].y)),
+    )
+
+
+def merge_regions(
+    regions: Iterable[Tuple[ScreenCoord, ScreenCoord]],
+    bounds: Tuple[ScreenCoord, ScreenCoord],
+) -> List[Tuple[ScreenCoord, ScreenCoord]]:
+    """
+    Clips the provided regions to `bounds`, and merges them into a list of
+    non-overlapping regions covering exactly the same cells.
+
+    Overlapping and touching spans are merged row by row first, then rows
+    with identical spans are stacked into taller regions. Merging row by row
+    (rather than taking bounding boxes) keeps outlines, like the borders of a
+    `Panel`, from turning into a region covering everything inside of them.
+    """
+    rows: Dict[int, List[Tuple[int, int]]] = {}
+    for region in regions:
+        left = max(region[0].x, bounds[0].x)
+        right = min(region[1].x, bounds[1].x)
+        if left > right:
+            continue
+        for y in range(
+            max(region[0].y, bounds[0].y), min(region[1].y, bounds[1].y) + 1
+        ):
+            rows.setdefault(y, []).append((left, right))
+
+    merged: List[Tuple[ScreenCoord, ScreenCoord]] = []
+    open_regions: Dict[Tuple[int, int], int] = {}  # Span -> top row
+    previous_y = None
+    for y in sorted(rows):
+        spans = sorted(rows[y])
+        row_spans = [spans[0]]
+        for left, right in spans[1:]:
+            if left <= row_spans[-1][1] + 1:
+                row_spans[-1] = (row_spans[-1][0], max(row_spans[-1][1], right))
+            else:
+                row_spans.append((left, right))
+
+        # Regions can only continue from the row directly above
+        if previous_y is None or not previous_y == y - 1:
+            for span, top in open_regions.items():
+                merged.append(
+                    (ScreenCoord(span[0], top), ScreenCoord(span[1], previous_y))
+                )
+            open_regions = {}
+
+        next_open_regions = {}
+        for span in row_spans:
+            next_open_regions[span] = open_regions.pop(span, y)
+        for span, top in open_regions.items():
+            merged.append((ScreenCoord(span[0], top), ScreenCoord(span[1], y - 1)))
+        open_regions = next_open_regions
+        previous_y = y
+
+    for span, top in open_regions.items():
+        merged.append((ScreenCoord(span[0], top), ScreenCoord(span[1], previous_y)))
+    return merged
+
+
+class CellBuffer:
+    """
+    A grid of screen cells, each holding a single character and the style it
+    should be drawn with.
+
+    `TUIWindow` keeps two of these: a back buffer which the draw calls for the
+    current frame are written into, and a front buffer which mirrors what has
+    already been sent to the terminal. Diffing the two lets us only send the
+    cells which actually changed.
+    """
+
+    __slots__ = ["width", "height", "characters", "styles"]
+
+    width: int
+    height: int
+    characters: List[List[str]]
+    styles: List[List[int]]
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.characters = [[" "] * width for _ in range(height)]
+        self.styles = [[0] * width for _ in range(height)]
+
+    def write(self, x: int, y: int, text: str, style: int = None) -> None:
+        if y < 0 or y >= self.height or x >= self.width:
+            return
+        if x < 0:
+            text = text[-x:]
+            x = 0
+        if x + len(text) > self.width:
+            text = text[: self.width - x]
+        if len(text) == 0:
+            return
+        if style is None:
+            style = 0
+
+        end = x + len(text)
+        self.characters[y][x:end] = text
+        self.styles[y][x:end] = [style] * len(text)
+
+    def clear(self, region: Optional[Tuple[ScreenCoord, ScreenCoord]] = None) -> None:
+        if region is None:
+            for y in range(self.height):
+                self.characters[y] = [" "] * self.width
+                self.styles[y] = [0] * self.width
+            return
+
+        left = max(0, region[0].x)
+        right = min(self.width - 1, region[1].x)
+        if left > right:
+            return
+        for y in range(max(0, region[0].y), min(self.height - 1, region[1].y) + 1):
+            self.characters[y][left : right + 1] = " " * (right - left + 1)
+            self.styles[y][left : right + 1] = [0] * (right - left + 1)
+
+    def copy_from(self, other: "CellBuffer", rows: Iterable[int] = None) -> None:
+        if (
+            rows is None
+            or not self.width == other.width
+            or not self.height == other.height
+        ):
+            self.width = other.width
+            self.height = other.height
+            self.characters = [row.copy() for row in other.characters]
+            self.styles = [row.copy() for row in other.styles]
+            return
+
+        for y in rows:
+            self.characters[y] = other.characters[y].copy()
+            self.styles[y] = other.styles[y].copy()
+
+    def diff(
+        self, previous: "CellBuffer", rows: Iterable[int] = None, max_gap: int = 0
+    ) -> Iterator[Tuple[int, int, str, int]]:
+        """
+        Yields `(x, y, text, style)` runs covering every cell which differs
+        from `previous`. Both buffers are expected to be the same size. If
+        `rows` is provided, only those rows are compared.
+
+        Each run shares a single style. Changed cells are coalesced into the
+        same run when they are separated by at most `max_gap` unchanged cells
+        of that style, since rewriting a few unchanged cells is cheaper than
+        starting a new run (Which means a new cursor move, and a new call into
+        curses).
+        """
+        if rows is None:
+            rows = range(self.height)
+        for y in rows:
+            characters = self.characters[y]
+            styles = self.styles[y]
+            previous_characters = previous.characters[y]
+            previous_styles = previous.styles[y]
+            if characters == previous_characters and styles == previous_styles:
+                continue
+
+            x = 0
+            while x < self.width:
+                if (
+                    characters[x] == previous_characters[x]
+                    and styles[x] == previous_styles[x]
+                ):
+                    x += 1
+                    continue
+
+                start = x
+                style = styles[x]
+                end = x + 1  # One past the last changed cell in the run
+                x += 1
+                while x < self.width and styles[x] == style:
+                    if (
+                        characters[x] != previous_characters[x]
+                        or styles[x] != previous_styles[x]
+                    ):
+                        end = x + 1
+                    elif x - end >= max_gap:
+                        break
+                    x += 1
+                yield start, y, "".join(characters[start:end]), style
+                x = end
+
+    def __repr__(self) -> str:
+        return f"CellBuffer(width={self.width}, height={self.height})"
+
+
+class HitIndex:
+    """
+    Finds the items whose regions cover a given screen cell, without having to
+    check every item. Regions are bucketed into a coarse grid, so a lookup only
+    checks the few items sharing the bucket of the cell.
+    """
+
+    BUCKET_WIDTH: int = 16
+    BUCKET_HEIGHT: int = 4
+
+    __slots__ = ["_buckets"]
+
+    _buckets: Dict[Tuple[int, int], List[Tuple[Tuple[ScreenCoord, ScreenCoord], Any]]]
+
+    def __init__(self) -> None:
+        self._buckets = {}
+
+    def add(self, region: Tuple[ScreenCoord, ScreenCoord], item: Any) -> None:
+        for bucket in self._bucket_keys(region):
+            self._buckets.setdefault(bucket, []).append((region, item))
+
+    def remove(self, region: Tuple[ScreenCoord, ScreenCoord], item: Any) -> None:
+        """Removes `item`, which must have been added with `region`"""
+        for bucket in self._bucket_keys(region):
+            entries = self._buckets.get(bucket)
+            if entries is None:
+                continue
+            entries[:] = [entry for entry in entries if entry[1] != item]
+            if len(entries) == 0:
+                del self._buckets[bucket]
+
+    def _bucket_keys(
+        self, region: Tuple[ScreenCoord, ScreenCoord]
+    ) -> Iterator[Tuple[int, int]]:
+        for bucket_y in range(
+            region[0].y // HitIndex.BUCKET_HEIGHT,
+            region[1].y // HitIndex.BUCKET_HEIGHT + 1,
+        ):
+            for bucket_x in range(
+                region[0].x // HitIndex.BUCKET_WIDTH,
+                region[1].x // HitIndex.BUCKET_WIDTH + 1,
+            ):
+                yield bucket_x, bucket_y
+
+    def overlapping(self, region: Tuple[ScreenCoord, ScreenCoord]) -> Set[Any]:
+        """Returns the items whose regions overlap `region`"""
+        items = set()
+        for bucket in self._bucket_keys(region):
+            entries = self._buckets.get(bucket)
+            if entries is None:
+                continue
+            for item_region, item in entries:
+                if regions_intersect(item_region, region):
+                    items.add(item)
+        return items
+
+    def at(self, x: int, y: int) -> List[Any]:
+        """Returns the items covering the cell, in the order they were added"""
+        bucket = self._buckets.get(
+            (x // HitIndex.BUCKET_WIDTH, y // HitIndex.BUCKET_HEIGHT)
+        )
+        if bucket is None:
+            return []
+        return [
+            item
+            for region, item in bucket
+            if region[0].x <= x <= region[1].x and region[0].y <= y <= region[1].y
+        ]
+
+    def clear(self) -> None:
+        self._buckets = {}
+
+    def __repr__(self) -> str:
+        return f"HitIndex(buckets={len(self._buckets)})"
+
+
+class DrawQueue:
+    """
+    The draw calls waiting to be written into a `CellBuffer`, stored as one
+    array per field rather than as a tuple per call. Clearing the queue keeps
+    its storage, so that drawing a frame does not allocate anything for the
+    calls once the queue has grown large enough.
+    """
+
+    __slots__ = ["xs", "ys", "zs", "styles", "texts", "count", "max_z"]
+
+    xs: array
+    ys: array
+    zs: array
+    styles: List[Optional[int]]
+    texts: List[str]
+    # The number of calls in the queue, the arrays past it are unused
+    count: int
+    max_z: int
+
+    def __init__(self) -> None:
+        self.xs = array("i")
+        self.ys = array("i")
+        self.zs = array("i")
+        self.styles = []
+        self.texts = []
+        self.count = 0
+        self.max_z = 0
+
+    def push(self, x: int, y: int, text: str, style: Optional[int], z: int = 0) -> None:
+        index = self.count
+        if index < len(self.texts):
+            self.xs[index] = x
+            self.ys[index] = y
+            self.zs[index] = z
+            self.styles[index] = style
+            self.texts[index] = text
+        else:
+            self.xs.append(x)
+            self.ys.append(y)
+            self.zs.append(z)
+            self.styles.append(style)
+            self.texts.append(text)
+        self.count = index + 1
+        if z > self.max_z:
+            self.max_z = z
+
+    def layers(self) -> Iterator[Tuple[int, Iterable[int]]]:
+        """
+        Yields each layer and the indices of the calls in it, from the top
+        layer down. Calls keep the order they were made in within a layer.
+        """
+        if self.max_z == 0:
+            yield 0, range(self.count)
+            return
+        layers: Dict[int, List[int]] = {}
+        zs = self.zs
+        for index in range(self.count):
+            layers.setdefault(zs[index], []).append(index)
+        for z in sorted(layers, reverse=True):
+            yield z, layers[z]
+
+    def clear(self) -> None:
+        self.count = 0
+        self.max_z = 0
+
+    def __len__(self) -> int:
+        return self.count
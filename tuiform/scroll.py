@@ -51,7 +51,7 @@ class ScrollPanel(TUIElement):
         pass  # TODO
 
     # TODO: moving the scroll bar should not need reframing
-    async def frame(self, draw_frame: DrawFrame) -> None:
+    def frame(self, draw_frame: DrawFrame) -> None:
         match self.orientation:
             case Orientation.HORIZONTAL:
                 self.content_size = self.content.get_size(
@@ -7,9 +7,14 @@ from tuiform.element import TUIElement, DrawFrame
 
 
 class Stack(TUIElement):
+    LAYOUT_ATTRIBUTES = {"orientation", "splits", "element_padding", "divider"}
+    INERT_ATTRIBUTES = {"element_padding_style", "divider_style"}
+
     orientation: Orientation
     element_padding: int
+    element_padding_style: int
     divider: str
+    divider_style: int
 
     def __init__(
         self,
@@ -23,43 +28,51 @@ class Stack(TUIElement):
     ) -> None:
         super().__init__()
         self.orientation = orientation
-        if splits is None:
-            self.splits = [None] * len(elements)
-        else:
-            self.splits = splits
         self.element_padding = element_padding
+        self.element_padding_style = element_padding_style
         self.divider = divider
+        self.divider_style = divider_style
+        self.set_elements(elements, splits)
 
-        if divider is not None:
+    def set_elements(
+        self,
+        elements: List[TUIElement],
+        splits: int | List[int | float | None] | None = None,
+    ) -> None:
+        """Replaces the elements of the stack, in one go"""
+        if splits is None:
+            splits = [None] * len(elements)
+
+        if self.divider is not None:
             # Interleave dividers of size 1
             new_elements = []
             new_splits = []
-            for i, (element, split) in enumerate(zip(elements, self.splits)):
+            for i, (element, split) in enumerate(zip(elements, splits)):
                 new_elements.append(element)
                 new_splits.append(split)
                 if i < len(elements) - 1:
-                    new_elements.append(Fill(divider, divider_style))
+                    new_elements.append(Fill(self.divider, self.divider_style))
                     new_splits.append(1)
 
             elements = new_elements
-            self.splits = new_splits
+            splits = new_splits
 
-        if element_padding > 0:
+        if self.element_padding > 0:
             # Interleave padding
             new_elements = []
             new_splits = []
-            for i, (element, split) in enumerate(zip(elements, self.splits)):
+            for i, (element, split) in enumerate(zip(elements, splits)):
                 new_elements.append(element)
                 new_splits.append(split)
                 if i < len(elements) - 1:
-                    new_elements.append(Fill(" ", element_padding_style))
-                    new_splits.append(element_padding)
+                    new_elements.append(Fill(" ", self.element_padding_style))
+                    new_splits.append(self.element_padding)
 
             elements = new_elements
-            self.splits = new_splits
+            splits = new_splits
 
-        for element in elements:
-            self.add_child(element)
+        self.splits = splits
+        self.set_children(elements)
 
     def get_size(
         self, width_constraint: int | None = None, height_constraint: int | None = None
@@ -92,11 +105,11 @@ class Stack(TUIElement):
                 height = max(height, child_height)
         return width, height
 
-    async def frame(self, draw_frame: DrawFrame) -> None:
+    def frame(self, draw_frame: DrawFrame) -> None:
         self.draw_frame = draw_frame
         subframes = self.draw_frame.split(self.splits, self.orientation)
         for i, child in enumerate(self.children):
-            await child.frame(subframes[i])
+            child.frame(subframes[i])
 
     async def navigation_update(self, navigation_input: NavigationInput) -> None:
         if navigation_input is NavigationInput.NONE:
@@ -142,9 +155,9 @@ class Stack(TUIElement):
                 if not self.focusable_children[0].is_focused():
                     self.focus()
                     return
-            case (_, NavigationInput.LAST):  # TODO: fix this
+            case (_, NavigationInput.LAST):
                 if not self.focusable_children[-1].is_focused():
-                    self.focus()
+                    self.focus(last=True)
                     return
             case (_, NavigationInput.NEXT):
                 if self.parent is not None:
@@ -158,20 +171,10 @@ class Stack(TUIElement):
         if self.parent is not None:
             await self.parent.navigation_update(navigation_input)
 
-    async def update(
-        self, event_code: int, mouse_x: int, mouse_y: int, mouse_button: int
-    ) -> None:
-        for child in self.children:
-            await child.update(event_code, mouse_x, mouse_y, mouse_button)
-
-    async def execute(self) -> None:
-        for child in self.children:
-            await child.execute()
-
-    async def draw(self) -> None:
+    def draw(self) -> None:
         for child in self.children:
             if child.draw_frame.is_drawable:
-                await child.draw()
+                child.draw()
 
     def __repr__(self) -> str:
         return f"Stack(elements={self.children}, orientation={self.orientation}, splits={self.splits}, element_padding={self.element_padding}, divider={self.divider})"
@@ -0,0 +1,10 @@
+import curses
+
+
+def color_pair(pair_number: int) -> int:
+    """
+    The same attribute as `curses.color_pair`, but usable before `curses.initscr`
+    has been called (Which `curses.color_pair` refuses to do). This lets elements
+    be built and drawn with a backend which never touches curses.
+    """
+    return (pair_number << 8) & curses.A_COLOR
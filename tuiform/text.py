@@ -4,6 +4,7 @@ import curses
 
 from tuiform.enums import Orientation
 from tuiform.element import TUIElement, DrawFrame
+from tuiform.style import color_pair
 from tuiform.utils.wrap import (
     smart_wrap_text,
     right_pad_line,
@@ -12,6 +13,9 @@ from tuiform.utils.wrap import (
 
 
 class Text(TUIElement):
+    LAYOUT_ATTRIBUTES = {"text"}
+    PAINT_ATTRIBUTES = {"text_style", "new_line_character_style"}
+
     text: str
     text_style: int
     new_line_character_style: int
@@ -27,10 +31,12 @@ class Text(TUIElement):
         self._cached_lines: List[str] = []
         self._formatted_lines: List[str] = []
         self._cached_width: int = None
+        self._cached_text: str = None
         self._new_line_locations: List[Tuple[int, int]] = []
 
     def split_text(self, width: int):
         self._cached_width = width
+        self._cached_text = self.text
 
         # We are using a unicode character in the private use section so that
         # if there are line break characters already in the text we do not
@@ -61,13 +67,16 @@ class Text(TUIElement):
         self._cached_lines = cleaned_lines
         self._new_line_locations = new_line_locations
 
+    def _needs_split(self, width: int) -> bool:
+        return not width == self._cached_width or not self.text == self._cached_text
+
     def get_size(
         self, width_constraint: int | None = None, height_constraint: int | None = None
     ) -> Tuple[int]:
         if width_constraint is None:
             width_constraint = len(self.text)
 
-        if not width_constraint == self._cached_width:
+        if self._needs_split(width_constraint):
             self.split_text(width_constraint)
 
         if height_constraint is None:
@@ -75,12 +84,12 @@ class Text(TUIElement):
 
         return width_constraint, min(len(self._cached_lines), height_constraint)
 
-    async def frame(self, draw_frame: DrawFrame) -> None:
+    def frame(self, draw_frame: DrawFrame) -> None:
         self.draw_frame = draw_frame
         if not self.draw_frame.is_drawable:
             return
 
-        if not self.draw_frame.width == self._cached_width:
+        if self._needs_split(self.draw_frame.width):
             self.split_text(self.draw_frame.width)
 
         formatted_lines = self._cached_lines.copy()
@@ -92,8 +101,26 @@ class Text(TUIElement):
             formatted_lines[-1] = last_line
         self._formatted_lines = formatted_lines
 
+    def _layout_state(self) -> Tuple:
+        return (
+            self._cached_width,
+            self._cached_text,
+            self._cached_lines,
+            self._formatted_lines,
+            self._new_line_locations,
+        )
+
+    def _restore_layout_state(self, state: Tuple) -> None:
+        (
+            self._cached_width,
+            self._cached_text,
+            self._cached_lines,
+            self._formatted_lines,
+            self._new_line_locations,
+        ) = state
+
     # TODO: also draw the ellipses
-    async def draw(self) -> None:
+    def draw(self) -> None:
         for line_idx, line in enumerate(self._formatted_lines):
             self.draw_frame.draw(0, line_idx, line, self.text_style)
 
@@ -106,6 +133,8 @@ class Text(TUIElement):
 
 # TODO: fix the value coloring
 class DataValue(TUIElement):
+    INERT_ATTRIBUTES = {"label", "value", "label_text_box", "value_text_box"}
+
     label: str
     value: str
 
@@ -114,11 +143,13 @@ class DataValue(TUIElement):
         self.label = label + ":"
         self.value = value
         self.label_text_box = Text(
-            text=self.label, text_style=curses.color_pair(0) | curses.A_BOLD
+            text=self.label, text_style=color_pair(0) | curses.A_BOLD
         )
         self.value_text_box = Text(
-            text=self.value, text_style=curses.color_pair(2) | curses.A_BOLD
+            text=self.value, text_style=color_pair(2) | curses.A_BOLD
         )
+        self.add_child(self.label_text_box)
+        self.add_child(self.value_text_box)
 
     def get_size(
         self, width_constraint: int | None = None, height_constraint: int | None = None
@@ -135,7 +166,7 @@ class DataValue(TUIElement):
 
         return width, 1
 
-    async def frame(self, draw_frame: DrawFrame) -> None:
+    def frame(self, draw_frame: DrawFrame) -> None:
         self.draw_frame = draw_frame
         if not draw_frame.is_drawable:
             return
@@ -144,9 +175,9 @@ class DataValue(TUIElement):
         frames = draw_frame.split(
             [label_width, None], orientation=Orientation.HORIZONTAL
         )
-        await self.label_text_box.frame(frames[0])
-        await self.value_text_box.frame(frames[1])
+        self.label_text_box.frame(frames[0])
+        self.value_text_box.frame(frames[1])
 
-    async def draw(self) -> None:
-        await self.label_text_box.draw()
-        await self.value_text_box.draw()
+    def draw(self) -> None:
+        self.label_text_box.draw()
+        self.value_text_box.draw()